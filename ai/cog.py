@@ -1,20 +1,55 @@
 """Cog for all AI-related commands."""
 
+import asyncio
 import discord
 import logging
-from discord.ext import commands
+import os
+from discord.ext import commands, tasks
 from discord import app_commands
 
-from ai.commands import query
+from ai.commands import query, stats
+from ai.memory_store import memory_store
+from utils.env_utils import get_int_env
+from utils.tracing import metrics
 
 logger = logging.getLogger(__name__)
 
+# Prometheus text file with the bot's metrics, rewritten periodically
+METRICS_FILE = os.getenv("METRICS_FILE", "/data/metrics.prom" if os.path.exists("/data") else "metrics.prom")
+METRICS_INTERVAL = get_int_env("METRICS_INTERVAL", 60)
+# Hours between compactions of the knowledge graph
+MEMORY_COMPACT_HOURS = get_int_env("MEMORY_COMPACT_HOURS", 24)
+
 class AICog(commands.Cog, name="AI"):
     """A cog for all AI-related commands."""
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self):
+        self.write_metrics.start()
+        self.compact_memory.start()
+
+    async def cog_unload(self):
+        self.write_metrics.cancel()
+        self.compact_memory.cancel()
+
+    @tasks.loop(seconds=METRICS_INTERVAL)
+    async def write_metrics(self):
+        """Export the in-memory metrics for scraping."""
+        try:
+            await asyncio.to_thread(metrics.write_prometheus, METRICS_FILE)
+        except Exception as e:
+            logger.error(f"Failed to write metrics to {METRICS_FILE}: {e}")
+
+    @tasks.loop(hours=MEMORY_COMPACT_HOURS)
+    async def compact_memory(self):
+        """Merge duplicates the agent stored in memory and drop dangling relations."""
+        try:
+            await memory_store.compact()
+        except Exception as e:
+            logger.error(f"Memory compaction failed: {e}")
+
     @app_commands.command(name="ask", description="Ask a question to the AI")
     @app_commands.describe(
         question="The question you want to ask",
@@ -24,6 +59,12 @@ class AICog(commands.Cog, name="AI"):
         logger.info(f"Received /ask command from {interaction.user}")
         await query.execute(interaction, question, command)
 
+    @app_commands.command(name="stats", description="Show latency, tool and usage statistics")
+    @app_commands.default_permissions(administrator=True)
+    async def cmd_stats(self, interaction: discord.Interaction):
+        logger.info(f"Received /stats command from {interaction.user}")
+        await stats.execute(interaction)
+
 async def setup(bot: commands.Bot):
     """Set up the AI cog."""
-    await bot.add_cog(AICog(bot)) 
\ No newline at end of file
+    await bot.add_cog(AICog(bot))
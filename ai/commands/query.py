@@ -2,22 +2,58 @@
 import discord
 import logging
 from ai import interface
+from ai.streaming import StreamingReply
+from utils.discord_utils import split_message
+from utils.env_utils import get_stream_responses
+from utils.tracing import request_trace, span
 
 logger = logging.getLogger(__name__)
 
 async def execute(interaction: discord.Interaction, question: str, command: str | None = None):
     """Handle the /ask command."""
     logger.info(f"AI query from {interaction.user}: {question} command='{command}'")
-    await interaction.response.defer()
+    with request_trace("ask"):
+        await _answer(interaction, question, command)
+
+
+async def _answer(interaction: discord.Interaction, question: str, command: str | None):
+    await interaction.response.defer(thinking=True, ephemeral=False)
+    header = f"{interaction.user.mention} Asked: {question}\n\n"
+    stream = StreamingReply(interaction, header) if get_stream_responses() else None
+    queue_status_shown = False
     try:
-        instruction = f"COMMAND: {command}" if command else None
+        async def on_queued(position: int):
+            nonlocal queue_status_shown
+            status = f"Queued behind other questions (position {position})…"
+            if stream:
+                stream.set_status(status)
+            else:
+                # Shown in place of the public "thinking…" response, removed once answered
+                await interaction.edit_original_response(content=status)
+                queue_status_shown = True
 
-        ai_response = await interface.ask_question(interaction, question, prepend_instruction=instruction)
-        formatted_response = f"{interaction.user.mention} Asked: {question}\n\n{ai_response}"
-        await interaction.followup.send(formatted_response)
+        if stream:
+            await stream.start()
+        ai_response = await interface.ask_question(
+            interaction,
+            question,
+            command=command,
+            stream=stream,
+            on_queued=on_queued,
+        )
+        with span("discord_followup"):
+            if stream:
+                await stream.finish(ai_response)
+            else:
+                for chunk in split_message(f"{header}{ai_response}"):
+                    await interaction.followup.send(chunk)
+                if queue_status_shown:
+                    await interaction.delete_original_response()
         logger.info(f"AI response to {interaction.user}: {ai_response[:50]}...")
     except Exception as e:
         logger.error(f"Error in AI query execution: {e}")
-        await interaction.followup.send(
-            "Sorry, I encountered an error while processing your request."
-        )
+        error_message = "Sorry, I encountered an error while processing your request."
+        if stream and stream.messages:
+            await stream.finish(error_message)
+        else:
+            await interaction.followup.send(error_message)
@@ -0,0 +1,72 @@
+"""Admin command showing request latency and usage statistics."""
+import discord
+import logging
+
+from utils.tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+# Tools listed in the embed, slowest p95 first
+MAX_TOOLS = 10
+
+
+def _latency_lines(histograms: dict, label: str, limit: int | None = None) -> list[str]:
+    rows = sorted(histograms.items(), key=lambda item: item[1].quantile(0.95), reverse=True)
+    lines = []
+    for labels, histogram in rows[:limit]:
+        name = dict(labels).get(label, "?")
+        lines.append(
+            f"`{name}` n={histogram.count} p50={histogram.quantile(0.5):.2f}s "
+            f"p95={histogram.quantile(0.95):.2f}s p99={histogram.quantile(0.99):.2f}s"
+        )
+    return lines
+
+
+def build_stats_embed() -> discord.Embed:
+    """Summarize spans, tool calls, token usage and component stats."""
+    embed = discord.Embed(title="Bot Statistics", color=discord.Color.blue())
+
+    spans = _latency_lines(metrics.histograms("span_seconds"), "span")
+    embed.add_field(name="Request stages", value="\n".join(spans) or "No requests yet", inline=False)
+
+    tools = _latency_lines(metrics.histograms("tool_seconds"), "tool", MAX_TOOLS)
+    errors = {dict(labels)["tool"]: value for labels, value in metrics.counters("tool_errors_total").items()}
+    if errors:
+        tools.append("Errors: " + ", ".join(f"`{tool}` {int(count)}" for tool, count in errors.items()))
+    embed.add_field(name="Tool calls", value="\n".join(tools) or "No tool calls yet", inline=False)
+
+    tiers = _latency_lines(metrics.histograms("tier_run_seconds"), "tier")
+    routed = {dict(labels)["tier"]: int(value) for labels, value in metrics.counters("route_total").items()}
+    if routed:
+        tiers.append("Routed: " + ", ".join(f"`{tier}` {count}" for tier, count in sorted(routed.items())))
+    embed.add_field(name="Model tiers", value="\n".join(tiers) or "No runs yet", inline=False)
+
+    tokens = {dict(labels)["type"]: int(value) for labels, value in metrics.counters("llm_tokens_total").items()}
+    requests = int(sum(metrics.counters("llm_requests_total").values()))
+    runs = {dict(labels)["outcome"]: int(value) for labels, value in metrics.counters("agent_runs_total").items()}
+    embed.add_field(
+        name="Usage",
+        value=(
+            f"Runs: {runs.get('ok', 0)} ok, {runs.get('error', 0)} failed, {runs.get('timeout', 0)} timed out, "
+            f"{runs.get('max_turns', 0)} out of turns, {runs.get('cancelled', 0)} cancelled\n"
+            f"LLM requests: {requests}\n"
+            f"Tokens: {tokens.get('input', 0)} in ({tokens.get('cached', 0)} cached, "
+            f"{tokens.get('cached', 0) / max(tokens.get('input', 0), 1):.0%}), {tokens.get('output', 0)} out"
+        ),
+        inline=False,
+    )
+
+    gauges = metrics.gauges()
+    components = [
+        f"`{name}{''.join(f' {v}' for _, v in labels)}` {value:.3g}" for (name, labels), value in sorted(gauges.items())
+    ]
+    if components:
+        # Field values are limited to 1024 characters
+        value = "\n".join(components)
+        embed.add_field(name="Components", value=value[:1021] + "..." if len(value) > 1024 else value, inline=False)
+    return embed
+
+
+async def execute(interaction: discord.Interaction):
+    """Handle the /stats command."""
+    await interaction.response.send_message(embed=build_stats_embed(), ephemeral=True)
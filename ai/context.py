@@ -0,0 +1,66 @@
+"""Deterministic memory pre-fetch run before the agent loop."""
+import asyncio
+import json
+import logging
+
+from ai.memory_store import SYSPROMPT_ENTITY, memory_store
+
+logger = logging.getLogger(__name__)
+
+# Maximum entities returned per person search
+SEARCH_LIMIT = 10
+
+
+def _merge(graphs: list[dict]) -> tuple[dict[str, dict], list[dict]]:
+    entities: dict[str, dict] = {}
+    relations: dict[tuple, dict] = {}
+    for graph in graphs:
+        for entity in graph["entities"]:
+            entities.setdefault(entity["name"], entity)
+        for relation in graph["relations"]:
+            relations.setdefault((relation["from"], relation["to"], relation["relationType"]), relation)
+    return entities, list(relations.values())
+
+
+async def prefetch_memory_context(
+    username: str, mentioned: list[str], command: str | None = None
+) -> str:
+    """Load the memory the system prompt requires before every answer.
+
+    Fetches the sysprompt entity, the command entity and the profiles of the
+    asking user and every mentioned user in parallel, creating missing user
+    entities as the prompt's protocol demands, and renders them as a block
+    that is injected into the prompt.
+    """
+    people = list(dict.fromkeys([username, *mentioned]))
+    names = [SYSPROMPT_ENTITY, *people] + ([command] if command else [])
+    searches = people + ([command] if command else [])
+
+    opened, *found = await asyncio.gather(
+        memory_store.open_nodes(names),
+        *(memory_store.search_nodes(term, limit=SEARCH_LIMIT) for term in searches),
+    )
+    entities, relations = _merge([opened, *found])
+
+    missing = [name for name in people if name not in entities]
+    if missing:
+        created = await memory_store.create_entities(
+            [{"name": name, "entityType": "user", "observations": []} for name in missing]
+        )
+        for entity in created:
+            entities[entity["name"]] = entity
+        logger.info(f"Created memory entities for {missing}")
+
+    sections = []
+    sysprompt = entities.pop(SYSPROMPT_ENTITY, None)
+    if sysprompt and sysprompt["observations"]:
+        sections.append("Sysprompt (additional system instructions):\n" + "\n".join(sysprompt["observations"]))
+    if command:
+        command_entity = entities.pop(command, None)
+        sections.append(
+            f"Command '{command}' instructions: {json.dumps(command_entity)}"
+            if command_entity else f"Command '{command}': no stored instructions found"
+        )
+    sections.append("Entities: " + json.dumps(list(entities.values())))
+    sections.append("Relations: " + json.dumps(relations))
+    return "Preloaded memory (already retrieved for this question):\n" + "\n\n".join(sections)
@@ -0,0 +1,41 @@
+"""Upload search function tools exposed to the agent."""
+import json
+
+from agents import function_tool
+
+from filesystem.index import SEARCH_LIMIT, file_index
+
+
+@function_tool
+async def search_uploads(query: str, owner: str | None = None, limit: int = SEARCH_LIMIT) -> str:
+    """Full-text search over files uploaded to /data/uploads, best matches first.
+
+    Returns the path, uploader and a short matching snippet of each hit. Use this
+    before reading any uploaded file, and only read the files it points to.
+
+    Args:
+        query: Words to search for; files matching more and rarer words rank higher.
+        owner: Only search files uploaded by this username.
+        limit: Maximum number of results.
+    """
+    results = await file_index.search(query, owner=owner, limit=max(1, min(limit, 20)))
+    return json.dumps(results)
+
+
+@function_tool
+async def describe_upload(path: str) -> str:
+    """Get the metadata, extracted text and image previews of an uploaded file.
+
+    Text of documents and PDFs is already extracted, and large images have a
+    downscaled preview, so prefer this over reading the original file.
+
+    Args:
+        path: Full path of the uploaded file, as returned by search_uploads.
+    """
+    info = await file_index.describe(path)
+    if info is None:
+        return json.dumps({"error": f"{path} is not an indexed upload"})
+    return json.dumps(info)
+
+
+FILE_TOOLS = [search_uploads, describe_upload]
@@ -0,0 +1,261 @@
+"""Token-budgeted interaction history with an incrementally updated summary."""
+import asyncio
+import functools
+import json
+import logging
+import os
+from collections import OrderedDict, deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tiktoken
+except ImportError:  # Optional; token counts fall back to an estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a Discord assistant's past interactions. "
+    "Update the existing summary with the new interactions, keeping names, facts, "
+    "decisions and open questions, and dropping small talk. Reply with the updated "
+    "summary only, in at most {max_tokens} tokens."
+)
+
+
+@functools.cache
+def _get_encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"Could not load tiktoken encoding: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when installed, else estimate at ~4 chars per token."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+async def summarize_turns(summary: str, turns: list[tuple[str, str]], max_tokens: int, model: str) -> str:
+    """Fold new turns into an existing summary with a small, fast model."""
+    from openai import AsyncOpenAI
+
+    new_turns = "\n\n".join(f"Q: {q}\nA: {a}" for q, a in turns)
+    response = await AsyncOpenAI().chat.completions.create(
+        model=model,
+        max_tokens=max_tokens,
+        messages=[
+            {"role": "system", "content": SUMMARY_INSTRUCTIONS.format(max_tokens=max_tokens)},
+            {"role": "user", "content": f"Existing summary:\n{summary or '(none)'}\n\nNew interactions:\n{new_turns}"},
+        ],
+    )
+    return response.choices[0].message.content.strip()
+
+
+def truncate_summary(summary: str, turns: list[tuple[str, str]], max_tokens: int) -> str:
+    """Fallback fold: append clipped turns and drop the oldest lines over budget."""
+    lines = summary.splitlines() + [f"- Q: {q[:200]} / A: {a[:300]}" for q, a in turns]
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class HistoryManager:
+    """Recent turns kept verbatim under a token budget, older ones summarized.
+
+    When the verbatim turns exceed ``budget_tokens`` the oldest are evicted and
+    folded into a rolling summary in the background. Each fold only sends the
+    previous summary and the newly evicted turns, so the summary is updated
+    incrementally and never regenerated from the full history.
+
+    Every change is also reported to ``on_record`` as a log record, from which
+    ``replay`` can rebuild the manager later.
+    """
+
+    def __init__(
+        self,
+        budget_tokens: int = 2000,
+        summary_tokens: int = 400,
+        model: str = "gpt-4.1-nano",
+        on_record: Callable[[dict], None] | None = None,
+    ):
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = summary_tokens
+        self.model = model
+        self.on_record = on_record
+        self.summary = ""
+        # Number of logged turns already folded into the summary
+        self.folded = 0
+        self.turns: deque[tuple[str, str, int]] = deque()
+        self._turn_tokens = 0
+        self._pending: list[tuple[str, str]] = []
+        self._fold_task: asyncio.Task | None = None
+
+    def add(self, question: str, answer: str, record: bool = True):
+        """Record a turn, evicting the oldest turns into the summary if over budget."""
+        tokens = count_tokens(question) + count_tokens(answer)
+        self.turns.append((question, answer, tokens))
+        self._turn_tokens += tokens
+        while self.turns and self._turn_tokens > self.budget_tokens:
+            q, a, t = self.turns.popleft()
+            self._turn_tokens -= t
+            self._pending.append((q, a))
+        if self._pending and (self._fold_task is None or self._fold_task.done()):
+            self._fold_task = asyncio.create_task(self._fold())
+        if record and self.on_record:
+            self.on_record({"type": "turn", "q": question, "a": answer})
+
+    async def _fold(self):
+        while self._pending:
+            batch, self._pending = self._pending, []
+            try:
+                self.summary = await summarize_turns(self.summary, batch, self.summary_tokens, self.model)
+            except Exception as e:
+                logger.warning(f"History summarization failed, truncating instead: {e}")
+                self.summary = truncate_summary(self.summary, batch, self.summary_tokens)
+            self.folded += len(batch)
+            if self.on_record:
+                self.on_record({"type": "summary", "summary": self.summary, "folded": self.folded})
+            logger.info(f"Folded {len(batch)} turn(s) into history summary ({count_tokens(self.summary)} tokens)")
+
+    def render(self) -> tuple[str, int]:
+        """Return the history block for a prompt and its token count."""
+        lines = []
+        if self.summary:
+            lines.extend(["Summary of earlier interactions:", self.summary, ""])
+        # Oldest first and unnumbered, so the block only grows at its end
+        for q, a, _ in self.turns:
+            lines.extend(["Past interaction:", f"Q: {q}", f"A: {a}", ""])
+        text = "\n".join(lines)
+        return text, count_tokens(text) if text else 0
+
+    def replay(self, records: list[dict]):
+        """Rebuild state from log records: the latest summary plus the turns after it."""
+        turns = [(r["q"], r["a"]) for r in records if r["type"] == "turn"]
+        summaries = [r for r in records if r["type"] == "summary"]
+        if summaries:
+            self.summary = summaries[-1]["summary"]
+            self.folded = summaries[-1]["folded"]
+        for question, answer in turns[self.folded:]:
+            self.add(question, answer, record=False)
+
+    @property
+    def folding(self) -> bool:
+        """Whether evicted turns are still being folded into the summary."""
+        return bool(self._pending) or (self._fold_task is not None and not self._fold_task.done())
+
+    def snapshot(self) -> list[dict] | None:
+        """Return compacted log records for the current state, or None mid-fold.
+
+        The compacted log starts with the verbatim turns, so its summary
+        record has folded none of them.
+        """
+        if self.folding:
+            return None
+        return [{"type": "summary", "summary": self.summary, "folded": 0}] + [
+            {"type": "turn", "q": q, "a": a} for q, a, _ in self.turns
+        ]
+
+
+class HistoryStore:
+    """Interaction history sharded per (guild, channel) with on-disk logs.
+
+    Each shard is a ``HistoryManager`` backed by an append-only JSONL log that
+    is only replayed the first time the shard is used, so startup cost does
+    not grow with the amount of stored history. Idle shards are evicted from
+    memory in LRU order, and logs are compacted into a snapshot once they grow
+    past ``compact_after`` records. All file I/O runs on one writer thread,
+    which also keeps log writes in order.
+    """
+
+    def __init__(self, directory: str, max_shards: int = 64, compact_after: int = 500, **manager_kwargs):
+        self.directory = directory
+        self.max_shards = max_shards
+        self.compact_after = compact_after
+        self.manager_kwargs = manager_kwargs
+        self._shards: OrderedDict[tuple[int, int], HistoryManager] = OrderedDict()
+        self._record_counts: dict[tuple[int, int], int] = {}
+        self._lock = asyncio.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-log")
+
+    def _path(self, key: tuple[int, int]) -> str:
+        return os.path.join(self.directory, f"{key[0]}_{key[1]}.jsonl")
+
+    async def get(self, guild_id: int, channel_id: int) -> HistoryManager:
+        """Return the shard for a channel, replaying its log on first use."""
+        key = (guild_id, channel_id)
+        shard = self._shards.get(key)
+        if shard is None:
+            async with self._lock:
+                shard = self._shards.get(key)
+                if shard is None:
+                    shard = await self._load(key)
+        self._shards.move_to_end(key)
+        return shard
+
+    async def _load(self, key: tuple[int, int]) -> HistoryManager:
+        loop = asyncio.get_running_loop()
+        records = await loop.run_in_executor(self._writer, self._read, self._path(key))
+        shard = HistoryManager(on_record=lambda record: self._record(key, record), **self.manager_kwargs)
+        shard.replay(records)
+        self._shards[key] = shard
+        self._record_counts[key] = len(records)
+        # Shards still folding keep logging, so they stay until the fold is done
+        idle = [k for k, s in self._shards.items() if k != key and not s.folding]
+        for evicted in idle[: max(len(self._shards) - self.max_shards, 0)]:
+            del self._shards[evicted]
+            self._record_counts.pop(evicted, None)
+        logger.info(f"Loaded history shard {key} from {len(records)} log record(s)")
+        return shard
+
+    def _record(self, key: tuple[int, int], record: dict):
+        path = self._path(key)
+        self._writer.submit(self._append, path, record)
+        count = self._record_counts.get(key, 0) + 1
+        shard = self._shards.get(key)
+        if count > self.compact_after and shard:
+            snapshot = shard.snapshot()
+            if snapshot is not None:
+                self._writer.submit(self._rewrite, path, snapshot)
+                # Later summary records count folds from the start of the compacted log
+                shard.folded = 0
+                count = len(snapshot)
+        self._record_counts[key] = count
+
+    @staticmethod
+    def _read(path: str) -> list[dict]:
+        if not os.path.exists(path):
+            return []
+        records = []
+        with open(path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt history record in {path}")
+        return records
+
+    @staticmethod
+    def _append(path: str, record: dict):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logger.error(f"Failed to append history record to {path}: {e}")
+
+    @staticmethod
+    def _rewrite(path: str, records: list[dict]):
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.writelines(json.dumps(record) + "\n" for record in records)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Failed to compact history log {path}: {e}")
@@ -0,0 +1,93 @@
+"""Agents SDK tracing hooks feeding the in-process metrics."""
+import logging
+import time
+from typing import Any
+
+from agents.tracing import (
+    FunctionSpanData,
+    GenerationSpanData,
+    MCPListToolsSpanData,
+    ResponseSpanData,
+    Span,
+    Trace,
+    TracingProcessor,
+    add_trace_processor,
+)
+
+from utils.tracing import metrics, record_span
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsTracingProcessor(TracingProcessor):
+    """Record tool calls, MCP tool listings and LLM turns from agent runs.
+
+    The SDK calls processors synchronously from the task running the agent,
+    so the spans also land in the trace of the request being answered.
+    """
+
+    def __init__(self):
+        self._started: dict[str, float] = {}
+
+    def on_trace_start(self, trace: Trace) -> None:
+        pass
+
+    def on_trace_end(self, trace: Trace) -> None:
+        pass
+
+    def on_span_start(self, span: Span[Any]) -> None:
+        self._started[span.span_id] = time.perf_counter()
+
+    def on_span_end(self, span: Span[Any]) -> None:
+        started = self._started.pop(span.span_id, None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        data = span.span_data
+        if isinstance(data, FunctionSpanData):
+            server = (data.mcp_data or {}).get("server", "local")
+            record_span(f"tool:{data.name}", seconds, metric="tool_seconds", tool=data.name, server=server)
+            metrics.inc("tool_calls_total", tool=data.name, server=server)
+            if span.error:
+                metrics.inc("tool_errors_total", tool=data.name, server=server)
+        elif isinstance(data, (ResponseSpanData, GenerationSpanData)):
+            record_span("llm_turn", seconds)
+        elif isinstance(data, MCPListToolsSpanData):
+            record_span(f"mcp_list_tools:{data.server}", seconds, metric="span_seconds", span="mcp_list_tools")
+
+    def shutdown(self) -> None:
+        pass
+
+    def force_flush(self) -> None:
+        pass
+
+
+def record_usage(usage, tier: str) -> None:
+    """Add the token usage of a finished run to the counters and log it.
+
+    Cached input tokens are counted per tier as well, so the prompt cache hit
+    rate can be followed for each model.
+    """
+    cached = usage.input_tokens_details.cached_tokens or 0
+    metrics.inc("llm_requests_total", usage.requests)
+    metrics.inc("llm_tokens_total", usage.input_tokens, type="input")
+    metrics.inc("llm_tokens_total", usage.output_tokens, type="output")
+    metrics.inc("llm_tokens_total", cached, type="cached")
+    metrics.inc("tier_input_tokens_total", usage.input_tokens, tier=tier)
+    metrics.inc("tier_cached_tokens_total", cached, tier=tier)
+    hit_rate = cached / usage.input_tokens if usage.input_tokens else 0.0
+    logger.info(
+        f"Usage: {usage.requests} LLM requests, {usage.input_tokens} input tokens "
+        f"({cached} cached, {hit_rate:.0%}), {usage.output_tokens} output tokens"
+    )
+
+
+_installed = False
+
+
+def install_tracing() -> None:
+    """Register the metrics processor with the agents SDK once per process."""
+    global _installed
+    if not _installed:
+        add_trace_processor(MetricsTracingProcessor())
+        _installed = True
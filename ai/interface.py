@@ -1,99 +1,331 @@
+import asyncio
 import discord
 import logging
-import asyncio
-from collections import deque
+import os
+import time
 from ai.prompts import DISCORD_BOT_SYSTEM_PROMPT
-from utils.discord_utils import resolve_mentions, restore_mentions
-from ai.utils import create_mcp_servers
+from utils.discord_utils import resolve_mentions_with_names, restore_mentions
+from ai.context import prefetch_memory_context
+from ai.history import HistoryStore
+from ai.mcp_pool import MCPServerPool
+from ai.routing import STRONG_TIER, Route, Tier, route_question
+from ai.scheduler import AgentScheduler
+from ai.streaming import StreamFanout
+from ai.utils import create_mcp_server
+from ai.workers import AgentWorkerPool
+from utils.deadline import deadline, remaining
+from utils.env_utils import get_int_env
+from utils.tracing import metrics, record_span, span
 
 logger = logging.getLogger(__name__)
 
-# Shared interaction history across all commands
-interaction_history = deque(maxlen=10)
-interaction_history_lock = asyncio.Lock()
+# Interaction history per (guild, channel), persisted as append-only logs
+interaction_history = HistoryStore(
+    "/data/history" if os.path.exists("/data") else "history",
+    max_shards=get_int_env("HISTORY_MAX_SHARDS", 64),
+    budget_tokens=get_int_env("HISTORY_TOKEN_BUDGET", 2000),
+    summary_tokens=get_int_env("HISTORY_SUMMARY_TOKENS", 400),
+    model=os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4.1-nano"),
+)
+
+# MCP servers are pooled and leased per request
+mcp_pool = MCPServerPool(
+    create_mcp_server,
+    replicas={
+        "filesystem": get_int_env("MCP_REPLICAS", 2),
+        "thinking": get_int_env("MCP_REPLICAS", 2),
+    },
+)
+
+# Bounds concurrent agent runs and queues the rest fairly per guild and user
+scheduler = AgentScheduler(
+    max_concurrent=get_int_env("MAX_CONCURRENT_AGENTS", 3),
+    max_per_user=get_int_env("MAX_AGENTS_PER_USER", 1),
+)
+
+# Seconds each /ask may take from question to answer, queueing included
+ASK_DEADLINE = get_int_env("ASK_DEADLINE", 120)
+TIMEOUT_ANSWER = "Sorry, I ran out of time before I could answer. Please try again or ask a simpler question."
+TIMEOUT_NOTE = "_(I ran out of time, so this answer may be incomplete.)_"
+MAX_TURNS_NOTE = "_(I reached my step limit, so this answer may be incomplete.)_"
+
+# Agent runs go to worker processes when AGENT_WORKERS > 0, else run in this one
+agent_workers = get_int_env("AGENT_WORKERS", 0)
+worker_pool = AgentWorkerPool(agent_workers) if agent_workers > 0 else None
+
+# Agents per (tier, tool names); see _get_agent
+_agents: dict[tuple, object] = {}
+# Streams of the requests sharing each coalesced run, by single-flight key
+_fanouts: dict[tuple, StreamFanout] = {}
+
+metrics.register("scheduler", scheduler.stats)
+metrics.register("mcp_pool", mcp_pool.stats)
+if worker_pool:
+    metrics.register("agent_workers", worker_pool.stats)
+
+def _history_key(interaction: discord.Interaction) -> tuple[int, int]:
+    """Return the (guild, channel) history shard key of an interaction."""
+    return (
+        interaction.guild.id if interaction.guild else 0,
+        interaction.channel.id if interaction.channel else 0,
+    )
+
+
+def _single_flight_key(interaction: discord.Interaction, question: str) -> tuple:
+    """Return the key under which identical requests share one agent run.
+
+    Only the same user's repeats in the same channel share a run: the prompt
+    holds the asker's memory and the channel's history, and the answer is
+    recorded in that channel's history.
+    """
+    return (*_history_key(interaction), interaction.user.id, " ".join(question.casefold().split()))
+
 
-# MCP servers are initialized once and shared across requests
-_mcp_servers: list | None = None
-_mcp_servers_lock = asyncio.Lock()
+async def prepare_user_query(
+    interaction: discord.Interaction, question: str, command: str | None = None
+) -> tuple[str, str]:
+    """Build the final question with history, mention resolution and preloaded memory.
 
-async def prepare_user_query(interaction: discord.Interaction, question: str) -> tuple[str, str]:
-    """Build the final question with history and mention resolution."""
-    question_with_usernames = await resolve_mentions(interaction, question)
+    The parts are ordered from most to least stable (the channel's history,
+    summary and oldest turns first, then the memory preloaded for this asker
+    and question, then the question itself) so consecutive prompts in a
+    channel share as long a prefix as possible for provider-side prompt
+    caching.
+    """
+    with span("mention_resolution"):
+        question_with_usernames, mentioned = await resolve_mentions_with_names(interaction, question)
     asking_username = interaction.user.name
     base_question = f"User: {asking_username}\n\nQuestion:\n{question_with_usernames}"
+    try:
+        with span("memory_prefetch"):
+            memory_context = await prefetch_memory_context(asking_username, mentioned, command)
+    except Exception as e:
+        logger.error(f"Failed to prefetch memory context: {e}")
+        memory_context = None
 
-    history_lines = []
-    for idx, (q, a) in enumerate(reversed(interaction_history), start=1):
-        history_lines.extend(
-            [f"Interaction {idx} (past):", f"Q: {q}", f"A: {a}", ""]
-        )
-
-    if history_lines:
-        history_text = "\n".join(history_lines)
-        enhanced_question = (
-            f"{base_question}\n\n"
+    with span("history"):
+        history = await interaction_history.get(*_history_key(interaction))
+        history_text, history_tokens = history.render()
+    logger.info(f"History adds {history_tokens} prompt tokens")
+    parts = []
+    if history_text:
+        parts.append(
             "Previous interactions (for reference only, not part of the current question):\n"
             f"{history_text}"
         )
-    else:
-        enhanced_question = base_question
+    if memory_context:
+        parts.append(memory_context)
+    parts.append(f"Current question:\n{base_question}" if parts else base_question)
+    enhanced_question = "\n\n".join(parts)
 
     return enhanced_question, base_question
 
 
-async def get_mcp_servers():
-    """Initialize and return the shared MCP servers."""
-    global _mcp_servers
-    if _mcp_servers is None:
-        async with _mcp_servers_lock:
-            if _mcp_servers is None:
-                try:
-                    _mcp_servers = create_mcp_servers()
-                    for server in _mcp_servers:
-                        await server.connect()
-                    logger.info(f"Initialized {_mcp_servers!r}")
-                except Exception as e:
-                    logger.error(f"Failed to initialize MCP servers: {e}")
-                    _mcp_servers = []
-    return _mcp_servers
-
-async def run_agent_async(enhanced_question: str) -> str:
-    """Run the OpenAI agent with the given question."""
+def _get_agent(tier: Tier, tools: list):
+    """Return the agent for a tier and tool set, built once and reused.
+
+    Reusing one agent keeps the instructions and tool definitions, which
+    lead every request, byte-identical between runs.
+    """
+    from agents import Agent
+
+    key = (tier, tuple(tool.name for tool in tools))
+    agent = _agents.get(key)
+    if agent is None:
+        agent = _agents[key] = Agent(
+            name="discord-assistant",
+            instructions=DISCORD_BOT_SYSTEM_PROMPT,
+            model=tier.model,
+            tools=list(tools),
+        )
+    return agent
+
+
+async def start_mcp_servers():
+    """Connect the pooled MCP servers and start their health checks.
+
+    In worker mode the workers are started instead; each connects its own.
+    """
+    if worker_pool:
+        await worker_pool.start()
+    else:
+        await mcp_pool.start()
+
+class _AnswerBuffer:
+    """Text streamed by the current turn, kept for partial answers.
+
+    Deltas are also forwarded to the ``StreamingReply`` when there is one.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.text = ""
+        self.previous = ""
+
+    def feed(self, delta: str):
+        self.text += delta
+        if self.stream:
+            self.stream.feed(delta)
+
+    def reset(self):
+        if self.text:
+            self.previous, self.text = self.text, ""
+        if self.stream:
+            self.stream.reset()
+
+    def partial(self, note: str) -> str:
+        """Return the best text produced so far with ``note``, or an apology."""
+        text = (self.text or self.previous).strip()
+        return f"{text}\n\n{note}" if text else TIMEOUT_ANSWER
+
+
+async def run_agent_async(enhanced_question: str, stream=None, route: Route | None = None) -> str:
+    """Run the OpenAI agent with the given question.
+
+    The model and turn budget come from the ``route`` tier, the strong tier
+    if none is given. Text deltas are forwarded to the ``StreamingReply``
+    when one is given. The run is bounded by the request's deadline; if it
+    runs out of time or turns, the text produced so far is returned with a
+    note instead of an error.
+    """
     try:
-        from agents import Agent, Runner
+        from agents import Runner
+        from agents.exceptions import MaxTurnsExceeded
+        from ai.file_tools import FILE_TOOLS
+        from ai.instrumentation import install_tracing, record_usage
+        from ai.memory_tools import MEMORY_TOOLS
     except ImportError as e:
         logger.error(f"Failed to import agents: {e}")
         return "Sorry, the AI agent system is not available."
 
+    install_tracing()
+    tier = route.tier if route else STRONG_TIER
+    answer = _AnswerBuffer(stream)
     try:
-        mcp_servers = await get_mcp_servers()
-        agent = Agent(
-            name="discord-assistant",
-            instructions=DISCORD_BOT_SYSTEM_PROMPT,
-            model="gpt-4.1-mini",
-            mcp_servers=mcp_servers,
-        )
-        logger.info(f"Running agent with {len(mcp_servers)} MCP servers")
-        result = await Runner.run(agent, enhanced_question)
-        if hasattr(result, "final_output"):
-            return result.final_output
-        return str(result)
+        async with asyncio.timeout(remaining()):
+            lease_started = time.perf_counter()
+            await mcp_pool.start()
+            async with mcp_pool.lease() as mcp_servers:
+                record_span("mcp_lease", time.perf_counter() - lease_started)
+                # Only the leased servers differ between runs
+                agent = _get_agent(tier, [*MEMORY_TOOLS, *FILE_TOOLS]).clone(mcp_servers=mcp_servers)
+                logger.info(f"Running agent on {tier.name} tier ({tier.model}) with {len(mcp_servers)} MCP servers")
+                run_started = time.perf_counter()
+                result = Runner.run_streamed(agent, enhanced_question, max_turns=tier.max_turns)
+                try:
+                    await _forward_stream_events(result, answer, run_started)
+                except BaseException:
+                    # Stop the background run before its MCP servers go back to the pool
+                    result.cancel()
+                    raise
+                finally:
+                    elapsed = time.perf_counter() - run_started
+                    record_span("agent_run", elapsed)
+                    metrics.observe("tier_run_seconds", elapsed, tier=tier.name)
+        logger.info(f"Agent run on {tier.name} tier took {elapsed:.2f}s")
+        record_usage(result.context_wrapper.usage, tier.name)
+        metrics.inc("agent_runs_total", outcome="ok")
+        return result.final_output
+    except TimeoutError:
+        logger.warning(f"Agent run on {tier.name} tier hit the request deadline")
+        metrics.inc("agent_runs_total", outcome="timeout")
+        metrics.inc("deadline_exceeded_total", stage="agent_run")
+        return answer.partial(TIMEOUT_NOTE)
+    except MaxTurnsExceeded:
+        logger.warning(f"Agent run on {tier.name} tier exceeded {tier.max_turns} turns")
+        metrics.inc("agent_runs_total", outcome="max_turns")
+        return answer.partial(MAX_TURNS_NOTE)
+    except asyncio.CancelledError:
+        metrics.inc("agent_runs_total", outcome="cancelled")
+        raise
     except Exception as e:
         logger.error(f"Error running agent: {e}")
+        metrics.inc("agent_runs_total", outcome="error")
         return f"Sorry, I encountered an error while processing your request: {str(e)}"
 
+
+async def _forward_stream_events(result, answer: _AnswerBuffer, started: float):
+    """Feed text deltas from a streamed run into the answer buffer.
+
+    The time from ``started`` to the first text delta is recorded as the
+    ``first_token`` span.
+    """
+    from openai.types.responses import ResponseTextDeltaEvent
+
+    first_token = True
+    async for event in result.stream_events():
+        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+            if first_token:
+                record_span("first_token", time.perf_counter() - started)
+                first_token = False
+            answer.feed(event.data.delta)
+        elif event.type == "run_item_stream_event" and event.name == "tool_called":
+            answer.reset()
+    # The SDK ends the stream quietly when cancelled, e.g. by the deadline; re-raise
+    if asyncio.current_task().cancelling():
+        raise asyncio.CancelledError
+
 async def ask_question(
     interaction: discord.Interaction,
     question: str,
     prepend_instruction: str | None = None,
+    command: str | None = None,
+    stream=None,
+    on_queued=None,
 ) -> str:
-    """Send a question to the agent and return the response."""
+    """Send a question to the agent and return the response.
+
+    Runs go through the shared scheduler; a repeat of a question the same
+    user is already waiting on in the same channel is coalesced onto that
+    run instead and the answer is streamed to both replies. Other users'
+    questions never share a run, since the prompt carries the asker's
+    memory and the channel's history. The whole request, queueing
+    included, has ``ASK_DEADLINE`` seconds.
+    """
+    route = route_question(question, command)
+    metrics.inc("route_total", tier=route.tier.name)
+    logger.info(f"Routing to {route.tier.name} tier: {', '.join(route.reasons) or 'simple question'}")
+    if command and not prepend_instruction:
+        prepend_instruction = f"COMMAND: {command}"
     if prepend_instruction:
         question = f"{prepend_instruction}\n\n{question}"
 
-    enhanced_question, base_question = await prepare_user_query(interaction, question)
-    ai_response = await run_agent_async(enhanced_question)
-    async with interaction_history_lock:
-        interaction_history.append((base_question, ai_response))
-    ai_response_with_mentions = await restore_mentions(interaction, ai_response)
+    with deadline(ASK_DEADLINE):
+        enhanced_question, base_question = await prepare_user_query(interaction, question, command)
+        guild_id = interaction.guild.id if interaction.guild else 0
+
+        key = _single_flight_key(interaction, question)
+        fanout = _fanouts.get(key)
+        if fanout is None:
+            fanout = _fanouts[key] = StreamFanout()
+
+        async def answer() -> str:
+            queued_at = time.perf_counter()
+            try:
+                async with scheduler.slot(interaction.user.id, guild_id, on_queued=on_queued, timeout=remaining()):
+                    record_span("queue_wait", time.perf_counter() - queued_at)
+                    run = worker_pool.run if worker_pool else run_agent_async
+                    ai_response = await run(enhanced_question, stream=fanout if stream else None, route=route)
+            except TimeoutError:
+                logger.warning("Request deadline passed while queued for an agent run")
+                metrics.inc("deadline_exceeded_total", stage="queue")
+                return TIMEOUT_ANSWER
+            history = await interaction_history.get(*_history_key(interaction))
+            history.add(base_question, ai_response)
+            return ai_response
+
+        fanout.waiters += 1
+        if stream:
+            fanout.add(stream)
+        try:
+            # The run task inherits this deadline, so coalesced callers share its budget
+            ai_response = await scheduler.single_flight(key, answer)
+        finally:
+            if stream:
+                fanout.remove(stream)
+            fanout.waiters -= 1
+            if not fanout.waiters and _fanouts.get(key) is fanout:
+                del _fanouts[key]
+    with span("mention_restore"):
+        ai_response_with_mentions = await restore_mentions(interaction, ai_response)
     return ai_response_with_mentions
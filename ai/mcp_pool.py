@@ -0,0 +1,175 @@
+"""Self-healing pool of MCP server replicas shared by agent runs."""
+import asyncio
+import logging
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class _Replica:
+    """One MCP server process and its supervision state."""
+
+    def __init__(self, kind: str, index: int):
+        self.kind = kind
+        self.index = index
+        self.server = None
+        self.healthy = False
+        self.in_use = 0
+        # Set while no request holds a lease on the replica
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.leases = 0
+        self.reconnects = 0
+        self.ready = asyncio.Event()
+        self.check = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind}[{self.index}]"
+
+
+class MCPServerPool:
+    """Pool of MCP server replicas with health checks and automatic reconnects.
+
+    Each replica is owned by a supervisor task that connects it, pings it
+    periodically and reconnects with exponential backoff when it fails. The
+    connect and cleanup of a server always happen in that same task, as the
+    stdio transport requires. ``lease`` hands each request the least busy
+    healthy replica of every server kind.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], object],
+        replicas: dict[str, int],
+        ping_interval: float = 30.0,
+        timeout: float = 30.0,
+        max_backoff: float = 300.0,
+    ):
+        self.factory = factory
+        self.ping_interval = ping_interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self._replicas = {
+            kind: [_Replica(kind, idx) for idx in range(count)]
+            for kind, count in replicas.items()
+        }
+        self._starting: asyncio.Future | None = None
+
+    async def start(self):
+        """Start supervising all replicas and wait for their first connect attempt."""
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._start())
+        await asyncio.shield(self._starting)
+
+    async def _start(self):
+        replicas = [r for group in self._replicas.values() for r in group]
+        for replica in replicas:
+            replica.task = asyncio.create_task(self._supervise(replica))
+        await asyncio.gather(*(replica.ready.wait() for replica in replicas))
+        logger.info(f"MCP pool started: {self.stats()}")
+
+    async def close(self):
+        """Stop all supervisors, which also shuts down their servers."""
+        tasks = [r.task for group in self._replicas.values() for r in group if r.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._starting = None
+
+    async def _supervise(self, replica: _Replica):
+        backoff = 1.0
+        while True:
+            server = self.factory(replica.kind)
+            try:
+                async with asyncio.timeout(self.timeout):
+                    await server.connect()
+            except Exception as e:
+                logger.error(f"MCP {replica.label} failed to connect: {e}; retrying in {backoff:.0f}s")
+                await server.cleanup()
+                replica.ready.set()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            replica.server = server
+            replica.healthy = True
+            replica.ready.set()
+            backoff = 1.0
+            logger.info(f"MCP {replica.label} connected")
+            try:
+                while True:
+                    try:
+                        async with asyncio.timeout(self.ping_interval):
+                            await replica.check.wait()
+                    except TimeoutError:
+                        pass
+                    replica.check.clear()
+                    async with asyncio.timeout(self.timeout):
+                        await server.session.send_ping()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"MCP {replica.label} failed health check: {e!r}; reconnecting")
+                replica.reconnects += 1
+                # Stop new leases, then let runs using the server finish first
+                replica.healthy = False
+                await self._drain(replica)
+            finally:
+                replica.healthy = False
+                await server.cleanup()
+
+    async def _drain(self, replica: _Replica):
+        """Wait up to ``timeout`` for the requests leasing a replica to finish."""
+        if not replica.in_use:
+            return
+        try:
+            async with asyncio.timeout(self.timeout):
+                await replica.idle.wait()
+        except TimeoutError:
+            logger.warning(f"MCP {replica.label} still leased by {replica.in_use} request(s); closing it anyway")
+
+    @asynccontextmanager
+    async def lease(self):
+        """Yield one healthy server per kind for the duration of a request."""
+        picked = []
+        for kind, group in self._replicas.items():
+            healthy = [r for r in group if r.healthy]
+            if not healthy:
+                logger.warning(f"No healthy {kind} MCP server available")
+                continue
+            replica = min(healthy, key=lambda r: r.in_use)
+            replica.in_use += 1
+            replica.idle.clear()
+            replica.leases += 1
+            picked.append(replica)
+        try:
+            yield [replica.server for replica in picked]
+        except Exception:
+            # A failing request may mean a broken pipe; check the servers now
+            for replica in picked:
+                replica.check.set()
+            raise
+        finally:
+            for replica in picked:
+                replica.in_use -= 1
+                if not replica.in_use:
+                    replica.idle.set()
+
+    def stats(self) -> dict:
+        """Return per-kind replica health and utilization."""
+        stats = {}
+        for kind, group in self._replicas.items():
+            healthy = sum(r.healthy for r in group)
+            in_use = sum(r.in_use for r in group)
+            stats[kind] = {
+                "replicas": len(group),
+                "healthy": healthy,
+                "in_use": in_use,
+                "utilization": in_use / healthy if healthy else 0.0,
+                "leases": sum(r.leases for r in group),
+                "reconnects": sum(r.reconnects for r in group),
+            }
+        return stats
@@ -0,0 +1,441 @@
+"""SQLite-backed knowledge graph used as the assistant's memory."""
+import asyncio
+import json
+import logging
+import os
+import re
+
+from utils.env_utils import get_db_dir, get_int_env
+from utils.sqlite_store import SQLiteStore
+from utils.tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+# Entity holding global instructions added with "add to sysprompt: ..."
+SYSPROMPT_ENTITY = "sysprompt"
+# JSONL graph written by the former @modelcontextprotocol/server-memory backend
+LEGACY_MEMORY_FILE = "/data/memory.json"
+# Same JSONL format, rewritten after every compaction as a readable backup
+SNAPSHOT_FILE = os.getenv(
+    "MEMORY_SNAPSHOT_FILE", "/data/memory.snapshot.jsonl" if os.path.exists("/data") else ""
+)
+
+# Graph views returned to the model are capped at roughly this many characters
+MAX_VIEW_CHARS = get_int_env("MEMORY_VIEW_CHARS", 16000)
+# Most recent observations shown per entity in a view
+MAX_VIEW_OBSERVATIONS = get_int_env("MEMORY_VIEW_OBSERVATIONS", 25)
+
+# Relevance of an entity: how connected it is and how much is known about it,
+# most recently updated first among equals
+RELEVANCE_ORDER = (
+    "(SELECT COUNT(*) FROM relations WHERE source = entities.name)"
+    " + (SELECT COUNT(*) FROM relations WHERE target = entities.name)"
+    " + (SELECT COUNT(*) FROM observations WHERE entity_id = entities.id) DESC,"
+    " (SELECT MAX(rowid) FROM observations WHERE entity_id = entities.id) DESC, id DESC"
+)
+
+
+def _name_key(name: str, entity_type: str) -> str:
+    """Key under which variants of a name are the same entity.
+
+    User entities are named by Discord username, where "tom.b" and "tom_b"
+    are different people, so only case and a leading "@" are ignored. Other
+    names also ignore spacing and punctuation.
+    """
+    key = name.strip().lstrip("@").casefold()
+    if entity_type.casefold() == "user":
+        return key
+    return re.sub(r"[\s_.\-]+", "", key)
+
+
+def _is_canonical(name: str, entity_type: str) -> bool:
+    """Whether ``name`` is the spelling the memory pre-fetch opens entities by.
+
+    That is the sysprompt entity, or any name already in its key form,
+    such as a user entity named by its Discord username.
+    """
+    return name == SYSPROMPT_ENTITY or name == _name_key(name, entity_type)
+
+
+def _observation_key(content: str) -> str:
+    return " ".join(content.casefold().split()).rstrip(".!")
+
+GRAPH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    entity_type TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entities_type ON entities(entity_type);
+CREATE TABLE IF NOT EXISTS observations (
+    entity_id INTEGER NOT NULL REFERENCES entities(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    UNIQUE(entity_id, content)
+);
+CREATE TABLE IF NOT EXISTS relations (
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    relation_type TEXT NOT NULL,
+    PRIMARY KEY (source, target, relation_type)
+);
+CREATE INDEX IF NOT EXISTS idx_relations_target ON relations(target);
+"""
+
+
+class KnowledgeGraphStore(SQLiteStore):
+    """Knowledge graph of entities, observations and relations in SQLite.
+
+    Mirrors the data model and operations of the MCP memory server. Each
+    operation runs as a single transaction on the store's locked connection,
+    so concurrent tool calls are safe.
+    """
+
+    SCHEMA = GRAPH_SCHEMA
+
+    def _on_open(self):
+        self._import_legacy_graph()
+
+    def _import_legacy_graph(self):
+        """Import the old JSONL memory file once, into an empty store."""
+        if self._conn.execute("SELECT 1 FROM entities LIMIT 1").fetchone():
+            return
+        if not os.path.exists(LEGACY_MEMORY_FILE):
+            return
+        entities, relations = [], []
+        with open(LEGACY_MEMORY_FILE) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if item.get("type") == "entity":
+                    entities.append(item)
+                elif item.get("type") == "relation":
+                    relations.append(item)
+        self._create_entities(entities)
+        self._create_relations(relations)
+        logger.info(
+            f"Imported {len(entities)} entities and {len(relations)} relations "
+            f"from {LEGACY_MEMORY_FILE}"
+        )
+
+    # Queries -----------------------------------------------------------------
+
+    def _entity_rows(self, where: str, params: tuple, limit: int, offset: int) -> list[dict]:
+        rows = self._conn.execute(
+            f"SELECT id, name, entity_type FROM entities {where} ORDER BY {RELEVANCE_ORDER} LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+        return self._with_observations(rows)
+
+    def _with_observations(self, rows) -> list[dict]:
+        entities = {row[0]: {"name": row[1], "entityType": row[2], "observations": []} for row in rows}
+        if entities:
+            marks = ",".join("?" * len(entities))
+            for entity_id, content in self._conn.execute(
+                f"SELECT entity_id, content FROM observations WHERE entity_id IN ({marks}) ORDER BY rowid",
+                tuple(entities),
+            ):
+                entities[entity_id]["observations"].append(content)
+        return list(entities.values())
+
+    def _relations_for(self, names: list[str]) -> list[dict]:
+        if not names:
+            return []
+        marks = ",".join("?" * len(names))
+        rows = self._conn.execute(
+            f"SELECT source, target, relation_type FROM relations "
+            f"WHERE source IN ({marks}) OR target IN ({marks})",
+            (*names, *names),
+        ).fetchall()
+        return [{"from": s, "to": t, "relationType": r} for s, t, r in rows]
+
+    def _graph(self, entities: list[dict], bounded: bool = True) -> dict:
+        """Return a view of ``entities``, in order, capped at ``MAX_VIEW_CHARS``.
+
+        Each entity keeps its most recent observations only, entities past the
+        size cap are left out, and relations are included while they fit,
+        those between included entities first. Omitted counts are reported so
+        the model can page or open nodes instead. Unbounded views return
+        everything, for nodes opened by name.
+        """
+        if not bounded:
+            return {"entities": entities, "relations": self._relations_for([e["name"] for e in entities])}
+        view, size = [], 0
+        omitted_observations = 0
+        for entity in entities:
+            observations = entity["observations"]
+            if len(observations) > MAX_VIEW_OBSERVATIONS:
+                omitted_observations += len(observations) - MAX_VIEW_OBSERVATIONS
+                entity = {**entity, "observations": observations[-MAX_VIEW_OBSERVATIONS:]}
+            entity_size = len(json.dumps(entity))
+            if view and size + entity_size > MAX_VIEW_CHARS:
+                break
+            view.append(entity)
+            size += entity_size
+
+        names = {entity["name"] for entity in view}
+        relations = sorted(
+            self._relations_for(list(names)),
+            key=lambda r: not (r["from"] in names and r["to"] in names),
+        )
+        kept = []
+        for relation in relations:
+            size += len(json.dumps(relation))
+            if size > MAX_VIEW_CHARS:
+                break
+            kept.append(relation)
+
+        graph = {"entities": view, "relations": kept}
+        omitted = {
+            "entities": len(entities) - len(view),
+            "observations": omitted_observations,
+            "relations": len(relations) - len(kept),
+        }
+        if any(omitted.values()):
+            graph["omitted"] = omitted
+        return graph
+
+    def _create_entities(self, entities: list[dict]) -> list[dict]:
+        created = []
+        for entity in entities:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO entities (name, entity_type) VALUES (?, ?)",
+                (entity["name"], entity["entityType"]),
+            )
+            if cursor.rowcount:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO observations (entity_id, content) VALUES (?, ?)",
+                    [(cursor.lastrowid, obs) for obs in entity.get("observations", [])],
+                )
+                created.append(entity)
+        return created
+
+    def _create_relations(self, relations: list[dict]) -> list[dict]:
+        created = []
+        for relation in relations:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO relations (source, target, relation_type) VALUES (?, ?, ?)",
+                (relation["from"], relation["to"], relation["relationType"]),
+            )
+            if cursor.rowcount:
+                created.append(relation)
+        return created
+
+    def _entity_id(self, name: str) -> int | None:
+        row = self._conn.execute("SELECT id FROM entities WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _add_observations(self, observations: list[dict]) -> list[dict]:
+        results = []
+        for item in observations:
+            entity_id = self._entity_id(item["entityName"])
+            if entity_id is None:
+                raise ValueError(f"Entity with name {item['entityName']} not found")
+            added = []
+            for content in item["contents"]:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO observations (entity_id, content) VALUES (?, ?)",
+                    (entity_id, content),
+                )
+                if cursor.rowcount:
+                    added.append(content)
+            results.append({"entityName": item["entityName"], "addedObservations": added})
+        return results
+
+    def _delete_entities(self, names: list[str]):
+        self._conn.executemany("DELETE FROM entities WHERE name = ?", [(n,) for n in names])
+        self._conn.executemany(
+            "DELETE FROM relations WHERE source = ? OR target = ?", [(n, n) for n in names]
+        )
+
+    def _delete_observations(self, deletions: list[dict]):
+        for item in deletions:
+            entity_id = self._entity_id(item["entityName"])
+            if entity_id is not None:
+                self._conn.executemany(
+                    "DELETE FROM observations WHERE entity_id = ? AND content = ?",
+                    [(entity_id, obs) for obs in item["observations"]],
+                )
+
+    def _delete_relations(self, relations: list[dict]):
+        self._conn.executemany(
+            "DELETE FROM relations WHERE source = ? AND target = ? AND relation_type = ?",
+            [(r["from"], r["to"], r["relationType"]) for r in relations],
+        )
+
+    @staticmethod
+    def _page(graph: dict, offset: int, more: bool) -> dict:
+        """Add the offset of the next page when entities remain past this view."""
+        if more or graph.get("omitted", {}).get("entities"):
+            graph["next_offset"] = offset + len(graph["entities"])
+        return graph
+
+    def _read_graph(self, limit: int, offset: int) -> dict:
+        graph = self._graph(self._entity_rows("", (), limit, offset))
+        total = self._conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+        graph["total_entities"] = total
+        return self._page(graph, offset, offset + limit < total)
+
+    def _search_nodes(self, query: str, limit: int, offset: int) -> dict:
+        escaped = query.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+        # Exact name, then name, then type matches rank above observation matches
+        order = (
+            "lower(name) = ? DESC, lower(name) LIKE ? ESCAPE '\\' DESC, "
+            f"lower(entity_type) LIKE ? ESCAPE '\\' DESC, {RELEVANCE_ORDER}"
+        )
+        rows = self._conn.execute(
+            "SELECT id, name, entity_type FROM entities "
+            "WHERE lower(name) LIKE ? ESCAPE '\\' OR lower(entity_type) LIKE ? ESCAPE '\\' OR id IN "
+            "(SELECT entity_id FROM observations WHERE lower(content) LIKE ? ESCAPE '\\') "
+            f"ORDER BY {order} LIMIT ? OFFSET ?",
+            (pattern, pattern, pattern, query.lower(), pattern, pattern, limit + 1, offset),
+        ).fetchall()
+        # One extra row tells whether another page exists
+        graph = self._graph(self._with_observations(rows[:limit]))
+        return self._page(graph, offset, len(rows) > limit)
+
+    def _open_nodes(self, names: list[str]) -> dict:
+        if not names:
+            return {"entities": [], "relations": []}
+        marks = ",".join("?" * len(names))
+        rows = self._conn.execute(
+            f"SELECT id, name, entity_type FROM entities WHERE name IN ({marks}) ORDER BY id",
+            tuple(names),
+        ).fetchall()
+        return self._graph(self._with_observations(rows), bounded=False)
+
+    # Maintenance -------------------------------------------------------------
+
+    def _merge_entities(self, survivor: tuple, duplicates: list[tuple]) -> int:
+        """Fold ``duplicates`` (id, name) into ``survivor``, rewriting their relations."""
+        survivor_id, survivor_name = survivor
+        for entity_id, name in duplicates:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO observations (entity_id, content) "
+                "SELECT ?, content FROM observations WHERE entity_id = ? ORDER BY rowid",
+                (survivor_id, entity_id),
+            )
+            for column in ("source", "target"):
+                self._conn.execute(
+                    f"INSERT OR IGNORE INTO relations (source, target, relation_type) "
+                    f"SELECT {'?' if column == 'source' else 'source'}, "
+                    f"{'?' if column == 'target' else 'target'}, relation_type "
+                    f"FROM relations WHERE {column} = ?",
+                    (survivor_name, name),
+                )
+                self._conn.execute(f"DELETE FROM relations WHERE {column} = ?", (name,))
+            self._conn.execute("DELETE FROM entities WHERE id = ?", (entity_id,))
+        return len(duplicates)
+
+    def _compact(self) -> dict:
+        """Merge duplicate entities and observations and drop dangling relations.
+
+        Entities of the same type whose names share a ``_name_key`` are
+        merged: user entities differing only in case or a leading "@", others
+        also in spacing or punctuation. The canonical spelling survives if there is
+        one (see ``_is_canonical``), since the pre-fetch opens entities by
+        exact name; otherwise the entity with the most observations, the
+        oldest among equals. Runs as a single transaction, so readers see the graph
+        either before or after compaction.
+        """
+        groups: dict[str, list[tuple]] = {}
+        for entity_id, name, entity_type, count in self._conn.execute(
+            "SELECT id, name, entity_type, (SELECT COUNT(*) FROM observations WHERE entity_id = entities.id) "
+            "FROM entities ORDER BY id"
+        ):
+            key = (_name_key(name, entity_type) or name, entity_type.casefold())
+            groups.setdefault(key, []).append((not _is_canonical(name, entity_type), -count, entity_id, name))
+        merged = 0
+        for group in groups.values():
+            if len(group) > 1:
+                group.sort()
+                merged += self._merge_entities(group[0][2:], [e[2:] for e in group[1:]])
+
+        duplicates = []
+        seen: set[tuple[int, str]] = set()
+        for rowid, entity_id, content in self._conn.execute(
+            "SELECT rowid, entity_id, content FROM observations ORDER BY entity_id, rowid"
+        ):
+            key = (entity_id, _observation_key(content))
+            if key in seen:
+                duplicates.append((rowid,))
+            seen.add(key)
+        self._conn.executemany("DELETE FROM observations WHERE rowid = ?", duplicates)
+
+        dangling = self._conn.execute(
+            "DELETE FROM relations WHERE source = target "
+            "OR source NOT IN (SELECT name FROM entities) OR target NOT IN (SELECT name FROM entities)"
+        ).rowcount
+        return {"entities": merged, "observations": len(duplicates), "relations": dangling}
+
+    def _export(self) -> list[str]:
+        """Return the whole graph as JSONL lines in the memory server's format."""
+        lines = []
+        for entity in self._entity_rows("", (), -1, 0):
+            lines.append(json.dumps({"type": "entity", **entity}))
+        for source, target, relation_type in self._conn.execute(
+            "SELECT source, target, relation_type FROM relations ORDER BY rowid"
+        ):
+            lines.append(json.dumps({"type": "relation", "from": source, "to": target, "relationType": relation_type}))
+        return lines
+
+    # Public async API --------------------------------------------------------
+
+    async def create_entities(self, entities: list[dict]) -> list[dict]:
+        return await self._call(self._create_entities, entities)
+
+    async def create_relations(self, relations: list[dict]) -> list[dict]:
+        return await self._call(self._create_relations, relations)
+
+    async def add_observations(self, observations: list[dict]) -> list[dict]:
+        return await self._call(self._add_observations, observations)
+
+    async def delete_entities(self, names: list[str]):
+        await self._call(self._delete_entities, names)
+
+    async def delete_observations(self, deletions: list[dict]):
+        await self._call(self._delete_observations, deletions)
+
+    async def delete_relations(self, relations: list[dict]):
+        await self._call(self._delete_relations, relations)
+
+    async def read_graph(self, limit: int = 100, offset: int = 0) -> dict:
+        return await self._call(self._read_graph, limit, offset)
+
+    async def search_nodes(self, query: str, limit: int = 50, offset: int = 0) -> dict:
+        return await self._call(self._search_nodes, query, limit, offset)
+
+    async def open_nodes(self, names: list[str]) -> dict:
+        return await self._call(self._open_nodes, names)
+
+    async def compact(self) -> dict:
+        """Compact the graph, then write a JSONL snapshot of it if configured.
+
+        Returns how many entities, observations and relations were removed.
+        """
+        removed = await self._call(self._compact)
+        for kind, count in removed.items():
+            metrics.inc("memory_compacted_total", count, kind=kind)
+        logger.info(
+            f"Compacted memory: merged {removed['entities']} duplicate entities, removed "
+            f"{removed['observations']} duplicate observations and {removed['relations']} dangling relations"
+        )
+        if SNAPSHOT_FILE:
+            lines = await self._call(self._export)
+            await asyncio.to_thread(_write_snapshot, SNAPSHOT_FILE, lines)
+        return removed
+
+
+def _write_snapshot(path: str, lines: list[str]):
+    """Atomically replace ``path`` with the given JSONL lines."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote {len(lines)} memory records to {path}")
+
+
+# Knowledge graph shared by every agent run
+memory_store = KnowledgeGraphStore(os.path.join(get_db_dir(), "memory.db"))
@@ -0,0 +1,150 @@
+"""Knowledge graph function tools exposed to the agent.
+
+The tool names and arguments match the MCP memory server so the system
+prompt and existing habits of the model keep working.
+"""
+import json
+from typing import TypedDict
+
+from agents import function_tool
+
+from ai.memory_store import memory_store
+
+
+class Entity(TypedDict):
+    name: str
+    entityType: str
+    observations: list[str]
+
+
+# "from" is a keyword, so this one needs the functional syntax
+Relation = TypedDict("Relation", {"from": str, "to": str, "relationType": str})
+
+
+class ObservationAddition(TypedDict):
+    entityName: str
+    contents: list[str]
+
+
+class ObservationDeletion(TypedDict):
+    entityName: str
+    observations: list[str]
+
+
+@function_tool
+async def create_entities(entities: list[Entity]) -> str:
+    """Create multiple new entities in the knowledge graph.
+
+    Args:
+        entities: Entities to create; entities whose name already exists are skipped.
+    """
+    return json.dumps(await memory_store.create_entities(entities))
+
+
+@function_tool
+async def create_relations(relations: list[Relation]) -> str:
+    """Create multiple new relations between entities in the knowledge graph. Relations should be in active voice.
+
+    Args:
+        relations: Relations to create; existing relations are skipped.
+    """
+    return json.dumps(await memory_store.create_relations(relations))
+
+
+@function_tool
+async def add_observations(observations: list[ObservationAddition]) -> str:
+    """Add new observations to existing entities in the knowledge graph.
+
+    Args:
+        observations: Observations to add per entity name.
+    """
+    return json.dumps(await memory_store.add_observations(observations))
+
+
+@function_tool
+async def delete_entities(entityNames: list[str]) -> str:
+    """Delete multiple entities and their associated relations from the knowledge graph.
+
+    Args:
+        entityNames: Names of the entities to delete.
+    """
+    await memory_store.delete_entities(entityNames)
+    return "Entities deleted successfully"
+
+
+@function_tool
+async def delete_observations(deletions: list[ObservationDeletion]) -> str:
+    """Delete specific observations from entities in the knowledge graph.
+
+    Args:
+        deletions: Observations to delete per entity name.
+    """
+    await memory_store.delete_observations(deletions)
+    return "Observations deleted successfully"
+
+
+@function_tool
+async def delete_relations(relations: list[Relation]) -> str:
+    """Delete multiple relations from the knowledge graph.
+
+    Args:
+        relations: Relations to delete.
+    """
+    await memory_store.delete_relations(relations)
+    return "Relations deleted successfully"
+
+
+@function_tool
+async def read_graph(limit: int = 100, offset: int = 0) -> str:
+    """Read the knowledge graph one page of entities at a time, with their relations.
+
+    Entities come most connected and most recently updated first. Large pages
+    are trimmed to each entity's latest observations and a size cap; an
+    "omitted" field counts what was left out. When more entities remain,
+    "next_offset" is the offset of the next page; pass it as offset to
+    continue.
+
+    Args:
+        limit: Maximum number of entities to return.
+        offset: Number of entities to skip, for fetching later pages.
+    """
+    return json.dumps(await memory_store.read_graph(limit, offset))
+
+
+@function_tool
+async def search_nodes(query: str, limit: int = 50, offset: int = 0) -> str:
+    """Search for nodes in the knowledge graph by name, type or observation content.
+
+    Name matches come first. Results are trimmed like read_graph's, with an
+    "omitted" field counting what was left out and, when more matches
+    remain, a "next_offset" to pass as offset for the next page.
+
+    Args:
+        query: Case-insensitive text to search for.
+        limit: Maximum number of entities to return.
+        offset: Number of matching entities to skip, for fetching later pages.
+    """
+    return json.dumps(await memory_store.search_nodes(query, limit, offset))
+
+
+@function_tool
+async def open_nodes(names: list[str]) -> str:
+    """Open specific nodes in the knowledge graph by their names, with every relation involving them.
+
+    Args:
+        names: Entity names to retrieve.
+    """
+    return json.dumps(await memory_store.open_nodes(names))
+
+
+MEMORY_TOOLS = [
+    create_entities,
+    create_relations,
+    add_observations,
+    delete_entities,
+    delete_observations,
+    delete_relations,
+    read_graph,
+    search_nodes,
+    open_nodes,
+]
@@ -0,0 +1,72 @@
+"""Cheap local routing of questions to a fast or a strong model tier."""
+import logging
+import os
+import re
+from typing import NamedTuple
+
+from utils.discord_utils import MENTION_PATTERN
+from utils.env_utils import get_int_env
+
+logger = logging.getLogger(__name__)
+
+# Phrases that mean the answer has to write to or dig through memory
+MEMORY_TRIGGERS = re.compile(
+    r"\b(remember|forget|store this|note that|add to sysprompt|what did i (tell|say)|"
+    r"do you recall|update (my|your)|last (game|time|week))\b",
+    re.IGNORECASE,
+)
+# Words that usually mean several steps or tool calls
+MULTI_STEP = re.compile(
+    r"\b(compare|summari[sz]e|explain why|step by step|upload(ed|s)?|files?|documents?|and then)\b",
+    re.IGNORECASE,
+)
+
+
+class Tier(NamedTuple):
+    name: str
+    model: str
+    max_turns: int
+
+
+class Route(NamedTuple):
+    tier: Tier
+    reasons: tuple[str, ...]
+
+
+FAST_TIER = Tier(
+    "fast",
+    os.getenv("FAST_MODEL", "gpt-4.1-nano"),
+    get_int_env("FAST_MAX_TURNS", 4),
+)
+STRONG_TIER = Tier(
+    "strong",
+    os.getenv("STRONG_MODEL", "gpt-4.1-mini"),
+    get_int_env("STRONG_MAX_TURNS", 10),
+)
+# A question longer than this, or with more mentions, goes to the strong tier
+MAX_FAST_CHARS = get_int_env("ROUTE_MAX_FAST_CHARS", 160)
+MAX_FAST_MENTIONS = get_int_env("ROUTE_MAX_FAST_MENTIONS", 1)
+
+
+def route_question(question: str, command: str | None = None) -> Route:
+    """Pick the model tier for a question from local signals only.
+
+    Anything that looks like it needs memory writes, several tool calls or a
+    command's instructions goes to the strong tier; short small talk and
+    simple lookups go to the fast one.
+    """
+    reasons = []
+    if command:
+        reasons.append(f"command={command}")
+    if len(question) > MAX_FAST_CHARS:
+        reasons.append(f"chars={len(question)}")
+    mentions = len(MENTION_PATTERN.findall(question))
+    if mentions > MAX_FAST_MENTIONS:
+        reasons.append(f"mentions={mentions}")
+    if match := MEMORY_TRIGGERS.search(question):
+        reasons.append(f"memory={match.group(0).lower()!r}")
+    if match := MULTI_STEP.search(question):
+        reasons.append(f"multi_step={match.group(0).lower()!r}")
+    if question.count("?") > 1:
+        reasons.append("questions>1")
+    return Route(STRONG_TIER if reasons else FAST_TIER, tuple(reasons))
@@ -0,0 +1,175 @@
+"""Fair concurrency scheduling and single-flight coalescing for agent runs."""
+import asyncio
+import itertools
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from collections.abc import Awaitable, Callable, Hashable
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class AgentScheduler:
+    """Bounded scheduler for agent runs with per-guild and per-user fairness.
+
+    At most ``max_concurrent`` runs execute at once and each user has at most
+    ``max_per_user`` of them. Waiting requests are queued per guild and per
+    user and released round-robin, so one busy user or guild cannot starve the
+    others. Identical requests already being answered can be coalesced with
+    ``single_flight``.
+    """
+
+    def __init__(self, max_concurrent: int = 3, max_per_user: int = 1):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self._running = 0
+        self._running_per_user: Counter = Counter()
+        # guild ID -> user ID -> waiting futures
+        self._queues: OrderedDict[int, OrderedDict[int, deque[asyncio.Future]]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.completed = 0
+        self.coalesced = 0
+        self.waited = 0
+        self.total_wait = 0.0
+
+    @property
+    def queued(self) -> int:
+        return sum(
+            1 for users in self._queues.values() for queue in users.values()
+            for future in queue if not future.done()
+        )
+
+    def _can_start(self, user_id: int) -> bool:
+        return (
+            self._running < self.max_concurrent
+            and self._running_per_user[user_id] < self.max_per_user
+        )
+
+    def _start(self, user_id: int):
+        self._running += 1
+        self._running_per_user[user_id] += 1
+
+    def _release(self, user_id: int):
+        self._running -= 1
+        self._running_per_user[user_id] -= 1
+        if not self._running_per_user[user_id]:
+            del self._running_per_user[user_id]
+        self.completed += 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to waiting requests, rotating guilds then users."""
+        while self._running < self.max_concurrent:
+            picked = self._next_waiter()
+            if picked is None:
+                return
+            user_id, future = picked
+            self._start(user_id)
+            future.set_result(None)
+
+    def _next_waiter(self) -> tuple[int, asyncio.Future] | None:
+        for guild_id in list(self._queues):
+            users = self._queues[guild_id]
+            for user_id in list(users):
+                queue = users[user_id]
+                while queue and queue[0].done():
+                    queue.popleft()  # Abandoned by a cancelled request
+                if not queue:
+                    del users[user_id]
+                    continue
+                if self._running_per_user[user_id] >= self.max_per_user:
+                    continue
+                future = queue.popleft()
+                if queue:
+                    users.move_to_end(user_id)
+                else:
+                    del users[user_id]
+                if users:
+                    self._queues.move_to_end(guild_id)
+                else:
+                    del self._queues[guild_id]
+                return user_id, future
+            if not users:
+                del self._queues[guild_id]
+        return None
+
+    def position(self, future: asyncio.Future) -> int:
+        """Return the 1-based position of a waiting request in fair dispatch order."""
+        def interleave(lists):
+            return [
+                item for group in itertools.zip_longest(*lists)
+                for item in group if item is not None
+            ]
+
+        per_guild = [
+            interleave([[f for f in queue if not f.done()] for queue in users.values()])
+            for users in self._queues.values()
+        ]
+        order = interleave(per_guild)
+        return order.index(future) + 1 if future in order else 0
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id: int,
+        guild_id: int,
+        on_queued: Callable[[int], Awaitable[None]] | None = None,
+        timeout: float | None = None,
+    ):
+        """Hold a run slot for the duration of the block, queueing if needed.
+
+        Raises ``TimeoutError`` if no slot frees up within ``timeout`` seconds.
+        """
+        # Free slots are handed out eagerly, so anything still queued is blocked
+        # by its own per-user limit and cannot be overtaken unfairly here.
+        if self._can_start(user_id):
+            self._start(user_id)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._queues.setdefault(guild_id, OrderedDict()).setdefault(user_id, deque()).append(future)
+            queued_at = time.monotonic()
+            try:
+                position = self.position(future)
+                logger.info(f"Queued agent run for user {user_id} at position {position}")
+                if on_queued:
+                    try:
+                        await on_queued(position)
+                    except Exception as e:
+                        logger.warning(f"Queue feedback failed: {e}")
+                async with asyncio.timeout(timeout):
+                    await future
+            except (asyncio.CancelledError, TimeoutError):
+                if future.done() and not future.cancelled():
+                    self._release(user_id)  # Slot was granted just as we were cancelled
+                future.cancel()
+                raise
+            self.waited += 1
+            self.total_wait += time.monotonic() - queued_at
+        try:
+            yield
+        finally:
+            self._release(user_id)
+
+    async def single_flight(self, key: Hashable, factory: Callable[[], Awaitable]):
+        """Run ``factory`` once per key; concurrent callers share its result."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+            logger.info("Coalesced identical agent request with one already in flight")
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        """Return current load and lifetime counters."""
+        return {
+            "running": self._running,
+            "queued": self.queued,
+            "completed": self.completed,
+            "coalesced": self.coalesced,
+            "waited": self.waited,
+            "avg_wait": self.total_wait / self.waited if self.waited else 0.0,
+        }
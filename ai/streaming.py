@@ -0,0 +1,158 @@
+"""Incrementally edited Discord replies for streamed agent answers."""
+import asyncio
+import logging
+import time
+
+import discord
+
+from utils.discord_utils import restore_mentions, split_message
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between edits, keeping well under Discord's webhook edit limits
+EDIT_INTERVAL = 1.2
+MESSAGE_LIMIT = 2000
+PLACEHOLDER = "…"
+
+
+class StreamingReply:
+    """Follow-up message(s) that are edited as answer tokens arrive.
+
+    Edits are coalesced so at most one happens per ``EDIT_INTERVAL``. Mention
+    restoration is only applied up to the last whitespace of the partial text
+    so a half-streamed username is never turned into the wrong mention, and
+    content beyond the message limit rolls over into additional messages.
+    """
+
+    def __init__(self, interaction: discord.Interaction, header: str):
+        self.interaction = interaction
+        self.header = header
+        self.text = ""
+        self.status = PLACEHOLDER
+        self.messages: list[discord.WebhookMessage] = []
+        self._rendered: list[str] = []
+        self._dirty = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # Set by finish; the edit loop exits after its current render
+        self._stopping = False
+        self._rendering = False
+        self._last_edit = 0.0
+        self.started_at = time.monotonic()
+        self.first_token_at: float | None = None
+
+    async def start(self):
+        """Post the initial follow-up and begin the edit loop."""
+        await self._render([self.header + PLACEHOLDER])
+        self._task = asyncio.create_task(self._edit_loop())
+
+    def feed(self, delta: str):
+        """Append streamed text; the message is updated on the next edit tick."""
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.text += delta
+        self._dirty.set()
+
+    def set_status(self, status: str):
+        """Show a status line in place of the answer until text arrives."""
+        self.status = status
+        self._dirty.set()
+
+    def reset(self):
+        """Discard text streamed before a tool call; only the final turn is the answer."""
+        if self.text:
+            self.text = ""
+            self._dirty.set()
+
+    async def finish(self, final_text: str):
+        """Stop streaming and render the complete, mention-restored answer.
+
+        An edit already being sent is allowed to complete, so the final render
+        starts from the messages as Discord has them.
+        """
+        if self._task:
+            self._stopping = True
+            if not self._rendering:
+                # Waiting between edits, nothing is half done
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self._render(split_message(self.header + final_text, MESSAGE_LIMIT))
+        if self.first_token_at is not None:
+            logger.info(f"Streamed reply: first token after {self.first_token_at - self.started_at:.2f}s")
+
+    async def _edit_loop(self):
+        while not self._stopping:
+            await self._dirty.wait()
+            delay = self._last_edit + EDIT_INTERVAL - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._dirty.clear()
+            try:
+                chunks = split_message(self.header + await self._partial(), MESSAGE_LIMIT)
+                self._rendering = True
+                await self._render(chunks)
+            except discord.HTTPException as e:
+                logger.warning(f"Failed to update streamed reply: {e}")
+            except Exception as e:
+                logger.error(f"Error updating streamed reply: {e!r}")
+            finally:
+                self._rendering = False
+
+    async def _partial(self) -> str:
+        text = self.text
+        if not text:
+            return self.status
+        cut = max(text.rfind(" "), text.rfind("\n")) + 1
+        stable = await restore_mentions(self.interaction, text[:cut]) if cut else ""
+        return f"{stable}{text[cut:]} {PLACEHOLDER}"
+
+    async def _render(self, chunks: list[str]):
+        """Edit changed messages, send new ones for overflow and drop extras."""
+        for idx, chunk in enumerate(chunks):
+            if idx < len(self.messages):
+                if self._rendered[idx] != chunk:
+                    await self.messages[idx].edit(content=chunk)
+                    self._rendered[idx] = chunk
+            else:
+                message = await self.interaction.followup.send(chunk, wait=True)
+                self.messages.append(message)
+                self._rendered.append(chunk)
+        while len(self.messages) > len(chunks):
+            await self.messages.pop().delete()
+            self._rendered.pop()
+        self._last_edit = time.monotonic()
+
+
+class StreamFanout:
+    """Forwards the deltas of one agent run to every reply waiting on it.
+
+    Requests coalesced onto a run in flight add their ``StreamingReply``;
+    replies that join late are first fed the text streamed so far.
+    """
+
+    def __init__(self):
+        self.replies: list[StreamingReply] = []
+        self.text = ""
+        # Requests sharing the run, with or without a reply
+        self.waiters = 0
+
+    def add(self, reply: StreamingReply):
+        if self.text:
+            reply.feed(self.text)
+        self.replies.append(reply)
+
+    def remove(self, reply: StreamingReply):
+        if reply in self.replies:
+            self.replies.remove(reply)
+
+    def feed(self, delta: str):
+        self.text += delta
+        for reply in self.replies:
+            reply.feed(delta)
+
+    def reset(self):
+        self.text = ""
+        for reply in self.replies:
+            reply.reset()
@@ -0,0 +1,179 @@
+"""Read-through cache for read-only MCP tool calls.
+
+Results of read-only tools are memoized per (server, tool, arguments) in one
+LRU shared by every replica of a server kind, so repeated lookups skip the
+stdio round trip. Entries remember the paths their arguments name; a
+mutating tool call, or a write outside MCP such as an upload, drops every
+entry whose paths overlap the written ones.
+
+Calls that do reach the server are bounded by ``MCP_CALL_TIMEOUT`` and by the
+request's remaining deadline.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections.abc import Callable
+
+from utils.cache import TTLCache
+from utils.deadline import remaining
+from utils.env_utils import get_int_env
+from utils.tracing import metrics
+
+logger = logging.getLogger(__name__)
+
+# Tools whose results only depend on their arguments and the files they name
+READ_ONLY_TOOLS = {
+    "read_file",
+    "read_text_file",
+    "read_media_file",
+    "read_multiple_files",
+    "list_directory",
+    "list_directory_with_sizes",
+    "directory_tree",
+    "search_files",
+    "get_file_info",
+    "list_allowed_directories",
+}
+# Tools that change the files they name
+MUTATING_TOOLS = {"write_file", "edit_file", "create_directory", "move_file"}
+# Argument names that hold paths
+PATH_ARGUMENTS = ("path", "paths", "source", "destination")
+# Longest a single tool call may take, whatever the request's deadline
+MCP_CALL_TIMEOUT = get_int_env("MCP_CALL_TIMEOUT", 30)
+
+
+def _paths(arguments: dict | None) -> tuple[str, ...]:
+    paths = []
+    for key in PATH_ARGUMENTS:
+        value = (arguments or {}).get(key)
+        for path in value if isinstance(value, list) else [value]:
+            if isinstance(path, str) and path:
+                paths.append(os.path.normpath(path))
+    return tuple(paths)
+
+
+def _overlaps(a: str, b: str) -> bool:
+    """Return whether one path is the other or contains it."""
+    return a == b or a.startswith(b.rstrip("/") + "/") or b.startswith(a.rstrip("/") + "/")
+
+
+class ToolResultCache:
+    """LRU of tool results with path-based invalidation."""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 300.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._paths: dict[tuple, tuple[str, ...]] = {}
+        self.invalidations = 0
+        # Bumped by every invalidation so reads racing a write are not stored
+        self.generation = 0
+        # Called with the paths of every local invalidation, e.g. to tell other processes
+        self.listeners: list[Callable[[list[str]], None]] = []
+
+    @staticmethod
+    def key(server: str, tool: str, arguments: dict | None) -> tuple:
+        return (server, tool, json.dumps(arguments or {}, sort_keys=True, default=str))
+
+    def get(self, key: tuple):
+        return self._cache.get(key)
+
+    def set(self, key: tuple, result, arguments: dict | None, generation: int):
+        if generation != self.generation:
+            return
+        self._cache.set(key, result)
+        self._paths[key] = _paths(arguments)
+        # Forget paths of entries the LRU has evicted meanwhile
+        if len(self._paths) > 2 * self._cache.maxsize:
+            live = set(self._cache.keys())
+            self._paths = {k: v for k, v in self._paths.items() if k in live}
+
+    def invalidate(self, *paths: str, propagate: bool = True):
+        """Drop every entry whose arguments overlap one of ``paths``.
+
+        Listeners are notified unless ``propagate`` is false, as for
+        invalidations that arrive from another process.
+        """
+        written = [os.path.normpath(path) for path in paths]
+        self.generation += 1
+        if propagate and written:
+            for listener in self.listeners:
+                listener(written)
+        dropped = 0
+        for key in self._cache.keys():
+            if any(_overlaps(mine, path) for mine in self._paths.get(key, ()) for path in written):
+                self._cache.pop(key)
+                self._paths.pop(key, None)
+                dropped += 1
+        if dropped:
+            self.invalidations += dropped
+            logger.debug("Invalidated %d cached tool results for %s", dropped, written)
+
+    def clear(self):
+        self._cache.clear()
+        self._paths.clear()
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "invalidations": self.invalidations}
+
+
+class CachingMCPServer:
+    """Proxy around an MCP server that answers read-only calls from the cache.
+
+    Everything but ``call_tool`` is delegated, so the proxy can stand in for
+    the server in the pool and in ``Agent.mcp_servers``.
+    """
+
+    def __init__(self, server, cache: ToolResultCache):
+        self._server = server
+        self._cache = cache
+
+    def __getattr__(self, name: str):
+        return getattr(self._server, name)
+
+    @property
+    def name(self) -> str:
+        return self._server.name
+
+    async def _call(self, tool_name: str, arguments: dict | None):
+        """Call the server within the request's budget.
+
+        A call that runs out of time returns an error result instead of
+        raising, so the model can still answer with what it has.
+        """
+        timeout = remaining(MCP_CALL_TIMEOUT)
+        try:
+            async with asyncio.timeout(timeout):
+                return await self._server.call_tool(tool_name, arguments)
+        except TimeoutError:
+            from mcp.types import CallToolResult, TextContent
+
+            logger.warning(f"MCP tool {self.name}.{tool_name} timed out after {timeout:.1f}s")
+            metrics.inc("tool_timeouts_total", tool=tool_name, server=self.name)
+            message = f"Tool call timed out after {timeout:.0f}s; answer with the information you already have."
+            return CallToolResult(content=[TextContent(type="text", text=message)], isError=True)
+
+    async def call_tool(self, tool_name: str, arguments: dict | None):
+        if tool_name in MUTATING_TOOLS:
+            try:
+                return await self._call(tool_name, arguments)
+            finally:
+                self._cache.invalidate(*_paths(arguments))
+        if tool_name not in READ_ONLY_TOOLS:
+            return await self._call(tool_name, arguments)
+
+        key = self._cache.key(self.name, tool_name, arguments)
+        result = self._cache.get(key)
+        if result is None:
+            generation = self._cache.generation
+            result = await self._call(tool_name, arguments)
+            if not getattr(result, "isError", False):
+                self._cache.set(key, result, arguments, generation)
+        return result
+
+
+# Shared by all replicas; uploads invalidate it through ``invalidate``
+tool_cache = ToolResultCache(
+    maxsize=get_int_env("MCP_CACHE_SIZE", 512),
+    ttl=get_int_env("MCP_CACHE_TTL", 300),
+)
+metrics.register("mcp_tool_cache", tool_cache.stats)
@@ -1,61 +1,56 @@
 """Utility functions for AI processing."""
 import logging
-from agents.mcp.server import MCPServerStdio
-from utils.discord_utils import resolve_mentions, restore_mentions
 
 logger = logging.getLogger(__name__)
 
+# Launch parameters for each MCP server kind, all local stdio processes.
+# The knowledge graph is served in-process by ai.memory_tools instead.
+MCP_SERVER_PARAMS = {
+    # Filesystem server
+    "filesystem": {
+        "command": "npx",
+        "args": ["-y", "@modelcontextprotocol/server-filesystem", "/data"],
+    },
+    # Sequential thinking server
+    "thinking": {
+        "command": "npx",
+        "args": ["-y", "@modelcontextprotocol/server-sequential-thinking"],
+    },
+}
+
+
+def create_mcp_server(kind: str):
+    """Create a single, unconnected MCP server of the given kind.
+
+    The server is wrapped so read-only tool results are served from the
+    shared ``tool_cache``.
+    """
+    # Imported lazily so loading the cogs does not pull in the agents SDK
+    from agents.mcp.server import MCPServerStdio
+
+    from ai.tool_cache import CachingMCPServer, tool_cache
+
+    server = MCPServerStdio(
+        params=MCP_SERVER_PARAMS[kind],
+        cache_tools_list=True,  # Cache tools for performance
+        name=kind,
+    )
+    return CachingMCPServer(server, tool_cache)
+
+
 def create_mcp_servers():
-   """Create the configured MCP servers for the agents package.
-   
-   Returns:
-       List: List of MCPServerStdio instances for the agents package
-   """
-   
-   mcp_servers = []
-   
-   try:
-       # Memory server (knowledge graph) - local stdio
-       memory_server = MCPServerStdio(
-           params={
-               "command": "npx",
-               "args": ["-y", "@modelcontextprotocol/server-memory"],
-               "env": {"MEMORY_FILE_PATH": "/data/memory.json"}
-           },
-           cache_tools_list=True  # Cache tools for performance
-       )
-       mcp_servers.append(memory_server)
-       logger.info("Added memory MCP server")
-   except Exception as e:
-       logger.warning(f"Could not configure memory server: {e}")
-   
-   try:
-       # Filesystem server - local stdio
-       filesystem_server = MCPServerStdio(
-           params={
-               "command": "npx", 
-               "args": ["-y", "@modelcontextprotocol/server-filesystem", "/data"]
-           },
-           cache_tools_list=True  # Cache tools for performance
-       )
-       mcp_servers.append(filesystem_server)
-       logger.info("Added filesystem MCP server")
-   except Exception as e:
-       logger.warning(f"Could not configure filesystem server: {e}")
-   
-   try:
-       # Sequential thinking server - local stdio
-       thinking_server = MCPServerStdio(
-           params={
-               "command": "npx",
-               "args": ["-y", "@modelcontextprotocol/server-sequential-thinking"]
-           },
-           cache_tools_list=True  # Cache tools for performance
-       )
-       mcp_servers.append(thinking_server)
-       logger.info("Added thinking MCP server")
-   except Exception as e:
-       logger.warning(f"Could not configure thinking server: {e}")
-   
-   logger.info(f"Configured {len(mcp_servers)} MCP servers")
-   return mcp_servers
+    """Create the configured MCP servers for the agents package.
+
+    Returns:
+        List: List of MCPServerStdio instances for the agents package
+    """
+    mcp_servers = []
+    for kind in MCP_SERVER_PARAMS:
+        try:
+            mcp_servers.append(create_mcp_server(kind))
+            logger.info(f"Added {kind} MCP server")
+        except Exception as e:
+            logger.warning(f"Could not configure {kind} server: {e}")
+
+    logger.info(f"Configured {len(mcp_servers)} MCP servers")
+    return mcp_servers
@@ -0,0 +1,319 @@
+"""Agent runs in worker processes, off the Discord gateway's event loop.
+
+With ``AGENT_WORKERS`` above zero the bot starts that many ``python -m
+ai.workers`` processes. Each one owns its MCP server pool and answers jobs
+sent as JSON lines on its stdin. Streamed text deltas, tool cache
+invalidations and, at the end of every job, the answer plus the spans and
+metrics recorded for it are written back on its stdout. The bot process
+keeps scheduling, history, mention handling and Discord delivery.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+
+from utils.deadline import deadline, remaining
+from utils.logging_utils import request_id_var, set_request_id
+from utils.tracing import capture_spans, extend_trace, metrics
+
+logger = logging.getLogger(__name__)
+
+# Longest JSON line accepted from a worker; answers and traces fit easily
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Component gauges each worker reports back with its results
+WORKER_GAUGES = ("mcp_pool_", "mcp_tool_cache_")
+# Seconds past a job's deadline before the bot stops waiting for the worker
+DEADLINE_GRACE = 5.0
+CRASHED_ANSWER = "Sorry, the assistant crashed while answering. Please try again."
+
+
+class _Worker:
+    """One worker process and the jobs it is answering."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: asyncio.subprocess.Process | None = None
+        self.jobs: dict[int, tuple[asyncio.Future, object]] = {}
+        self.completed = 0
+        self.restarts = 0
+        self.gauges: dict[str, float] = {}
+        self.task: asyncio.Task | None = None
+        self.ready = asyncio.Event()
+        # Whether the current process has connected its MCP servers
+        self.connected = False
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+
+class AgentWorkerPool:
+    """Dispatches agent runs to supervised worker processes.
+
+    Jobs go to the worker with the fewest jobs in flight. A worker that exits
+    fails its jobs with an apology and is restarted with exponential backoff.
+    """
+
+    def __init__(self, count: int, max_backoff: float = 60.0):
+        self.max_backoff = max_backoff
+        self._workers = [_Worker(idx) for idx in range(count)]
+        self._ids = itertools.count()
+        self._starting: asyncio.Future | None = None
+
+    async def start(self):
+        """Start the worker processes and wait until each has connected its MCP servers."""
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._start())
+        await asyncio.shield(self._starting)
+
+    async def _start(self):
+        from ai.tool_cache import tool_cache
+
+        tool_cache.listeners.append(self._broadcast_invalidation)
+        for worker in self._workers:
+            worker.task = asyncio.create_task(self._supervise(worker))
+        await asyncio.gather(*(worker.ready.wait() for worker in self._workers))
+        logger.info(f"Agent worker pool started: {self.stats()}")
+
+    async def close(self):
+        """Stop the supervisors and terminate the workers."""
+        for worker in self._workers:
+            if worker.task:
+                worker.task.cancel()
+        await asyncio.gather(*(w.task for w in self._workers if w.task), return_exceptions=True)
+        self._starting = None
+
+    async def _spawn(self, worker: _Worker):
+        env = {**os.environ, "AGENT_WORKERS": "0"}
+        worker.connected = False
+        worker.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "ai.workers", str(worker.index),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=PROJECT_DIR,
+            env=env,
+            limit=MAX_MESSAGE_BYTES,
+        )
+        logger.info(f"Agent worker {worker.index} started with pid {worker.process.pid}")
+
+    async def _supervise(self, worker: _Worker):
+        backoff = 1.0
+        while True:
+            try:
+                await self._spawn(worker)
+                await self._read(worker)
+            except asyncio.CancelledError:
+                if worker.alive:
+                    worker.process.kill()
+                    await worker.process.wait()
+                raise
+            except Exception as e:
+                logger.error(f"Agent worker {worker.index} failed: {e!r}")
+                # Its messages can no longer be read, so it must not get new jobs
+                if worker.alive:
+                    worker.process.kill()
+            returncode = await worker.process.wait() if worker.process else None
+            worker.ready.set()
+            for future, _ in worker.jobs.values():
+                if not future.done():
+                    future.set_result(CRASHED_ANSWER)
+            worker.jobs.clear()
+            worker.restarts += 1
+            if worker.connected:
+                # It was up and serving, so this is not a crash loop
+                backoff = 1.0
+            logger.error(f"Agent worker {worker.index} exited with {returncode}; restarting in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _read(self, worker: _Worker):
+        """Handle messages from a worker until its stdout closes."""
+        from ai.tool_cache import tool_cache
+
+        async for line in worker.process.stdout:
+            message = json.loads(line)
+            kind = message["type"]
+            if kind == "ready":
+                worker.connected = True
+                worker.ready.set()
+                continue
+            if kind == "invalidate":
+                # Tell the other workers, but not the one that wrote the paths
+                tool_cache.invalidate(*message["paths"], propagate=False)
+                self._broadcast_invalidation(message["paths"], origin=worker)
+                continue
+            future, stream = worker.jobs.get(message.get("id"), (None, None))
+            if future is None:
+                continue
+            if kind == "feed" and stream is not None:
+                stream.feed(message["text"])
+            elif kind == "reset" and stream is not None:
+                stream.reset()
+            elif kind == "done":
+                del worker.jobs[message["id"]]
+                worker.completed += 1
+                worker.gauges = message["gauges"]
+                metrics.merge(message["metrics"])
+                if not future.done():
+                    future.set_result((message["answer"], message["spans"]))
+
+    async def _send(self, worker: _Worker, message: dict):
+        worker.process.stdin.write(json.dumps(message).encode() + b"\n")
+        await worker.process.stdin.drain()
+
+    def _broadcast_invalidation(self, paths: list[str], origin: _Worker | None = None):
+        for worker in self._workers:
+            if worker.alive and worker is not origin:
+                asyncio.ensure_future(self._send(worker, {"type": "invalidate", "paths": paths}))
+
+    async def run(self, enhanced_question: str, stream=None, route=None) -> str:
+        """Answer a question in a worker; mirrors ``run_agent_async``."""
+        await self.start()
+        alive = [w for w in self._workers if w.alive]
+        if not alive:
+            logger.error("No agent worker available")
+            return CRASHED_ANSWER
+        worker = min(alive, key=lambda w: len(w.jobs))
+        job_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        worker.jobs[job_id] = (future, stream)
+        message = {
+            "type": "run",
+            "id": job_id,
+            "question": enhanced_question,
+            "tier": list(route.tier) if route else None,
+            "stream": stream is not None,
+            "request_id": request_id_var.get(),
+            "deadline": remaining(),
+        }
+        # The worker enforces the deadline itself; the grace covers shipping its answer back
+        budget = remaining()
+        try:
+            async with asyncio.timeout(None if budget is None else budget + DEADLINE_GRACE):
+                await self._send(worker, message)
+                result = await future
+        except (asyncio.CancelledError, TimeoutError) as e:
+            if worker.alive:
+                await asyncio.shield(self._send(worker, {"type": "cancel", "id": job_id}))
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            from ai.interface import TIMEOUT_ANSWER
+
+            logger.warning(f"Agent worker {worker.index} missed the deadline of job {job_id}")
+            metrics.inc("deadline_exceeded_total", stage="worker")
+            return TIMEOUT_ANSWER
+        finally:
+            worker.jobs.pop(job_id, None)
+        if isinstance(result, str):
+            return result
+        answer, spans = result
+        extend_trace(spans)
+        return answer
+
+    def stats(self) -> dict:
+        """Return per-pool counters plus each worker's own component gauges."""
+        stats = {
+            "workers": len(self._workers),
+            "alive": sum(1 for w in self._workers if w.alive),
+            "in_flight": sum(len(w.jobs) for w in self._workers),
+            "completed": sum(w.completed for w in self._workers),
+            "restarts": sum(w.restarts for w in self._workers),
+        }
+        for worker in self._workers:
+            stats[str(worker.index)] = {"in_flight": len(worker.jobs), **worker.gauges}
+        return stats
+
+
+class _StreamProxy:
+    """Stands in for ``StreamingReply`` inside a worker, forwarding deltas."""
+
+    def __init__(self, send, job_id: int):
+        self._send = send
+        self._job_id = job_id
+
+    def feed(self, text: str):
+        self._send({"type": "feed", "id": self._job_id, "text": text})
+
+    def reset(self):
+        self._send({"type": "reset", "id": self._job_id})
+
+
+async def _serve(index: int, output):
+    from ai import interface
+    from ai.routing import Route, Tier
+    from ai.tool_cache import tool_cache
+
+    def send(message: dict):
+        output.write(json.dumps(message).encode() + b"\n")
+        output.flush()
+
+    tool_cache.listeners.append(lambda paths: send({"type": "invalidate", "paths": paths}))
+    await interface.start_mcp_servers()
+    send({"type": "ready"})
+    logger.info(f"Agent worker {index} ready")
+
+    jobs: dict[int, asyncio.Task] = {}
+
+    async def run(message: dict):
+        set_request_id(message["request_id"])
+        tier = message["tier"]
+        route = Route(Tier(*tier), ()) if tier else None
+        stream = _StreamProxy(send, message["id"]) if message["stream"] else None
+        try:
+            with capture_spans() as spans, deadline(message["deadline"]):
+                answer = await interface.run_agent_async(message["question"], stream=stream, route=route)
+        except Exception as e:
+            logger.error(f"Agent job {message['id']} failed: {e!r}")
+            answer = f"Sorry, I encountered an error while processing your request: {e}"
+        finally:
+            jobs.pop(message["id"], None)
+        gauges = {
+            name + "".join(f"_{value}" for _, value in labels): value
+            for (name, labels), value in metrics.gauges().items()
+            if name.startswith(WORKER_GAUGES)
+        }
+        send({
+            "type": "done",
+            "id": message["id"],
+            "answer": answer,
+            "spans": spans,
+            "metrics": metrics.drain(),
+            "gauges": gauges,
+        })
+
+    reader = asyncio.StreamReader(limit=MAX_MESSAGE_BYTES)
+    loop = asyncio.get_running_loop()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    async for line in reader:
+        message = json.loads(line)
+        if message["type"] == "run":
+            jobs[message["id"]] = asyncio.create_task(run(message))
+        elif message["type"] == "cancel" and message["id"] in jobs:
+            jobs[message["id"]].cancel()
+        elif message["type"] == "invalidate":
+            tool_cache.invalidate(*message["paths"], propagate=False)
+    # The bot closed our stdin: it is shutting down
+    for task in jobs.values():
+        task.cancel()
+    await interface.mcp_pool.close()
+
+
+def main():
+    from dotenv import load_dotenv
+
+    from utils.logging_utils import setup_logging
+
+    index = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    # Messages own the real stdout; anything else printed goes to stderr
+    output = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    load_dotenv()
+    setup_logging(f"agent-worker-{index}.log", ship=False)
+    asyncio.run(_serve(index, output))
+
+
+if __name__ == "__main__":
+    main()
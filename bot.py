@@ -3,29 +3,32 @@
 This module initializes the Discord bot and registers all command modules.
 It handles bot startup and command synchronization.
 """
+import asyncio
+import hashlib
+import importlib
+import json
 import logging
 import os
 import sys
+import time
+from contextlib import contextmanager
 
 import discord
+from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 from utils.env_utils import get_discord_token, get_allowed_channel_id
-
-# Configure logging
-log_file = "/data/bot.log" if os.path.exists("/data") else "bot.log"
-logging.basicConfig(
-    level=logging.DEBUG,  # Changed to DEBUG for more detailed logs
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file)
-    ]
-)
-logger = logging.getLogger(__name__)
-logger.info(f"Logging to {log_file}")
+from utils.logging_utils import set_request_id, setup_logging
+from utils.roster import roster_cache
 
 # Load environment variables
 load_dotenv()
+
+# Configure logging: JSON lines on local disk, written off the event loop
+setup_logging()
+logger = logging.getLogger(__name__)
+command_hash_file = "/data/command_tree.hash" if os.path.exists("/data") else "command_tree.hash"
+
 TOKEN = get_discord_token()
 
 # Get the allowed channel ID
@@ -37,11 +40,35 @@ else:
         "CHANNEL environment variable not set or invalid. Commands will work in all channels."
     )
 
+class BotCommandTree(app_commands.CommandTree):
+    """Command tree that tags each interaction's log records with a request ID."""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Runs in the task that handles the command, so the ID follows it
+        set_request_id(f"{interaction.id:x}")
+        return True
+
+
 # Initialize the bot
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True  # Enable members intent for mention resolution
-bot = commands.Bot(command_prefix='!', intents=intents)
+bot = commands.Bot(command_prefix='!', intents=intents, tree_cls=BotCommandTree)
+
+
+# Startup phase name -> seconds, logged once the pipeline completes
+startup_timings: dict[str, float] = {}
+startup_began = time.perf_counter()
+
+
+@contextmanager
+def timed(phase: str):
+    """Record how long a startup phase takes."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[phase] = time.perf_counter() - start
 
 
 async def load_cogs():
@@ -52,30 +79,115 @@ async def load_cogs():
     logger.info("Filesystem cog loaded")
 
 
-@bot.event
-async def on_ready():
-    """Called when the bot is ready and connected to Discord."""
-    logger.info(f'Logged in as {bot.user.name} ({bot.user.id})')
-    
-    # Initialize MCP servers once for the agent interface
+def command_tree_hash() -> str:
+    """Return a hash of the application command signatures."""
+    payload = [command.to_dict(bot.tree) for command in bot.tree.get_commands()]
+    payload.sort(key=lambda command: command["name"])
+    data = json.dumps([bot.application_id, payload], sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+async def sync_commands():
+    """Sync commands with Discord, skipping the call if nothing changed."""
+    tree_hash = command_tree_hash()
     try:
-        from ai.interface import get_mcp_servers
-        await get_mcp_servers()
-        logger.info("MCP servers initialized")
-    except Exception as e:
-        logger.error(f"Failed to initialize MCP servers: {e}")
-    
-    # Load cogs
-    await load_cogs()
+        with open(command_hash_file) as f:
+            if f.read().strip() == tree_hash:
+                logger.info("Command tree unchanged, skipping sync")
+                return
+    except OSError:
+        pass
 
-    # Sync commands with Discord
     try:
         synced = await bot.tree.sync()
         logger.info(f"Synced {len(synced)} command(s)")
+        with open(command_hash_file, "w") as f:
+            f.write(tree_hash)
     except Exception as e:
         logger.error(f"Failed to sync commands: {e}")
 
 
+async def warm_up_agents():
+    """Import the agents SDK and connect the MCP servers off the critical path."""
+    with timed("agents_import"):
+        await asyncio.to_thread(importlib.import_module, "agents")
+    with timed("mcp_connect"):
+        try:
+            from ai.interface import start_mcp_servers
+            await start_mcp_servers()
+            logger.info("MCP servers initialized")
+        except Exception as e:
+            logger.error(f"Failed to initialize MCP servers: {e}")
+    log_startup_timings()
+
+
+def log_startup_timings():
+    """Log the per-phase startup timing breakdown."""
+    breakdown = ", ".join(f"{phase}={secs:.2f}s" for phase, secs in startup_timings.items())
+    logger.info(f"Startup timings: {breakdown}")
+
+
+@bot.event
+async def setup_hook():
+    """Run the one-time startup pipeline before connecting to the gateway.
+
+    Unlike ``on_ready`` this never re-runs on reconnects. Commands become
+    usable as soon as the cogs are loaded and synced; the agent SDK and MCP
+    servers are warmed up in the background.
+    """
+    with timed("load_cogs"):
+        await load_cogs()
+    with timed("sync_commands"):
+        await sync_commands()
+    global warm_up_task
+    warm_up_task = asyncio.create_task(warm_up_agents())
+
+
+warm_up_task: asyncio.Task | None = None
+
+
+@bot.event
+async def on_ready():
+    """Called when the bot is ready and connected to Discord."""
+    logger.info(f'Logged in as {bot.user.name} ({bot.user.id})')
+    if "ready" not in startup_timings:
+        startup_timings["ready"] = time.perf_counter() - startup_began
+        log_startup_timings()
+
+
+@bot.event
+async def on_member_join(member: discord.Member):
+    """Keep the roster cache current when a member joins."""
+    roster_cache.upsert(member)
+
+
+@bot.event
+async def on_member_remove(member: discord.Member):
+    """Keep the roster cache current when a member leaves."""
+    roster_cache.remove(member)
+
+
+@bot.event
+async def on_member_update(before: discord.Member, after: discord.Member):
+    """Keep the roster cache current when a nickname changes."""
+    roster_cache.upsert(after)
+
+
+@bot.event
+async def on_user_update(before: discord.User, after: discord.User):
+    """Keep the roster cache current when a username changes."""
+    for guild in after.mutual_guilds:
+        member = guild.get_member(after.id)
+        if member:
+            roster_cache.upsert(member)
+
+
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    """Drop the roster of a guild the bot has left."""
+    roster_cache.forget(guild.id)
+
+
 @bot.event
 async def on_command_error(ctx, error):
     """Handle command errors."""
@@ -93,7 +205,8 @@ async def cleanup():
 
 if __name__ == "__main__":
     try:
-        bot.run(TOKEN)
+        # Logging is already configured by setup_logging; don't add discord.py's stderr handler
+        bot.run(TOKEN, log_handler=None)
     except Exception as e:
         logger.critical(f"Failed to start bot: {e}")
         sys.exit(1)
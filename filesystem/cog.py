@@ -2,13 +2,19 @@
 
 import discord
 import logging
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 
+from filesystem import storage
 from filesystem.commands import upload, list_files
+from filesystem.index import file_index
+from utils.env_utils import get_int_env
 
 logger = logging.getLogger(__name__)
 
+# Minutes between background reconciliations of the file index
+FILE_INDEX_SCAN_MINUTES = get_int_env("FILE_INDEX_SCAN_MINUTES", 30)
+
 class FilesystemCog(commands.Cog, name="Filesystem"):
     """A cog for all filesystem-related commands."""
 
@@ -17,6 +23,21 @@ class FilesystemCog(commands.Cog, name="Filesystem"):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self):
+        self.reconcile_index.start()
+
+    async def cog_unload(self):
+        self.reconcile_index.cancel()
+        await storage.close()
+
+    @tasks.loop(minutes=FILE_INDEX_SCAN_MINUTES)
+    async def reconcile_index(self):
+        """Pick up files added, changed or removed outside of /file upload."""
+        try:
+            await file_index.reconcile()
+        except Exception as e:
+            logger.error(f"File index reconciliation failed: {e}")
+
     @file_group.command(name="upload")
     @app_commands.describe(file="File to upload")
     async def cmd_upload(self, interaction: discord.Interaction, file: discord.Attachment):
@@ -24,11 +45,22 @@ class FilesystemCog(commands.Cog, name="Filesystem"):
         await upload.execute(interaction, file)
 
     @file_group.command(name="list")
-    async def cmd_list(self, interaction: discord.Interaction):
+    @app_commands.describe(
+        user="Only show files uploaded by this user",
+        type="Only show files with this extension, e.g. pdf",
+        days="Only show files modified in the last N days",
+    )
+    async def cmd_list(
+        self,
+        interaction: discord.Interaction,
+        user: discord.User | None = None,
+        type: str | None = None,
+        days: app_commands.Range[int, 1] | None = None,
+    ):
         logger.info(f"Received /file list from {interaction.user}")
-        await list_files.execute(interaction)
+        await list_files.execute(interaction, user, type, days)
 
 async def setup(bot: commands.Bot):
     """Set up the Filesystem cog."""
     cog = FilesystemCog(bot)
-    await bot.add_cog(cog) 
\ No newline at end of file
+    await bot.add_cog(cog)
@@ -1,25 +1,107 @@
 """Command to list uploaded files."""
-import os
 import logging
+import time
+
 import discord
 
+from filesystem.index import file_index
+from utils.discord_utils import format_username
+
 logger = logging.getLogger(__name__)
 
-UPLOAD_DIR = "/data/uploads"
+PAGE_SIZE = 20
+# How long the page buttons keep working
+VIEW_TIMEOUT = 300
 
 
-async def execute(interaction: discord.Interaction):
-    """List all files stored in the uploads directory."""
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    files = sorted(os.listdir(UPLOAD_DIR))
+def _format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
 
-    if not files:
-        await interaction.response.send_message("No uploaded files found.")
-        return
 
-    embed = discord.Embed(
-        title="Uploaded Files",
-        description="\n".join(f"- {name}" for name in files),
-        color=discord.Color.blue(),
-    )
-    await interaction.response.send_message(embed=embed)
+class FileListView(discord.ui.View):
+    """Paginated listing of indexed files matching a fixed set of filters."""
+
+    def __init__(self, author_id: int, owner: str | None, ext: str | None, days: int | None):
+        super().__init__(timeout=VIEW_TIMEOUT)
+        self.author_id = author_id
+        self.owner = owner
+        self.ext = ext
+        self.days = days
+        self.since = time.time() - days * 86400 if days else None
+        self.page = 0
+        self.total = 0
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total // PAGE_SIZE))
+
+    async def render(self) -> discord.Embed:
+        """Load the current page from the index and return its embed."""
+        rows, self.total = await file_index.query(
+            self.owner, self.ext, self.since, limit=PAGE_SIZE, offset=self.page * PAGE_SIZE
+        )
+        filters = [
+            f"user: {self.owner}" if self.owner else "",
+            f"type: .{self.ext}" if self.ext else "",
+            f"last {self.days} day(s)" if self.days else "",
+        ]
+        embed = discord.Embed(
+            title="Uploaded Files",
+            description="\n".join(
+                f"- `{row['owner']}/{row['filename']}` · {_format_size(row['size'])} · <t:{int(row['mtime'])}:R>"
+                for row in rows
+            ) or "No uploaded files found.",
+            color=discord.Color.blue(),
+        )
+        footer = f"Page {self.page + 1}/{self.pages} · {self.total} file(s)"
+        if any(filters):
+            footer += " · " + ", ".join(f for f in filters if f)
+        embed.set_footer(text=footer)
+        self.prev_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Only the requester can page this list.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction: discord.Interaction):
+        embed = await self.render()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="Prev", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(0, self.page - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = min(self.pages - 1, self.page + 1)
+        await self._show(interaction)
+
+
+async def execute(
+    interaction: discord.Interaction,
+    user: discord.abc.User | None = None,
+    file_type: str | None = None,
+    days: int | None = None,
+):
+    """List uploaded files from the metadata index, newest first."""
+    owner = format_username(user) if user else None
+    ext = file_type.strip().lstrip(".").lower() if file_type else None
+    view = FileListView(interaction.user.id, owner, ext, days)
+    try:
+        embed = await view.render()
+    except Exception as e:
+        logger.error(f"Failed to query file index: {e}")
+        await interaction.response.send_message("Failed to list files.")
+        return
+    if view.pages == 1:
+        await interaction.response.send_message(embed=embed)
+    else:
+        await interaction.response.send_message(embed=embed, view=view)
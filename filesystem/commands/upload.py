@@ -1,32 +1,36 @@
 """Command to upload a file to the server."""
-import os
 import logging
 import discord
+from ai.tool_cache import tool_cache
+from filesystem.index import file_index
+from filesystem.storage import store_attachment
 from utils.discord_utils import format_username
 
 logger = logging.getLogger(__name__)
 
-UPLOAD_DIR = "/data/uploads"
-
 
 async def execute(interaction: discord.Interaction, file: discord.Attachment):
     """Save the uploaded file to the uploads directory."""
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-
+    await interaction.response.defer()
     username = format_username(interaction.user)
-    user_dir = os.path.join(UPLOAD_DIR, username)
-    os.makedirs(user_dir, exist_ok=True)
-
-    file_bytes = await file.read()
-    save_path = os.path.join(user_dir, file.filename)
     try:
-        with open(save_path, "wb") as f:
-            f.write(file_bytes)
-        await interaction.response.send_message(
+        stored = await store_attachment(file, username)
+        await file_index.record(stored.path, username, stored.sha256)
+        # Listings and reads of this path cached from the MCP server are stale now
+        tool_cache.invalidate(stored.path)
+        await interaction.followup.send(
             f"Uploaded `{file.filename}` successfully.")
         logger.info(
-            f"File {file.filename} uploaded by {interaction.user} to {save_path}")
+            f"File {file.filename} uploaded by {interaction.user} to {stored.path}")
     except Exception as e:
         logger.error(f"Failed to save uploaded file: {e}")
-        await interaction.response.send_message(
+        await interaction.followup.send(
             "Failed to save the uploaded file.")
+        return
+
+    # Extract text and build previews so the assistant can use the file
+    try:
+        await file_index.process(stored.path, stored.sha256)
+    except Exception as e:
+        logger.error(f"Failed to process {stored.path}: {e}")
+
@@ -0,0 +1,55 @@
+"""Plain-text extraction from uploaded files for the search index."""
+import os
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # Declared dependency; PDFs are not indexed if it is missing
+    PdfReader = None
+
+# Text beyond this many characters is not indexed
+MAX_TEXT_CHARS = 1_000_000
+# Bytes inspected to decide whether a file without a known extension is text
+SNIFF_BYTES = 8192
+
+TEXT_EXTENSIONS = {
+    "txt", "md", "rst", "csv", "tsv", "json", "jsonl", "yaml", "yml", "toml", "ini",
+    "cfg", "log", "xml", "html", "htm", "py", "js", "ts", "java", "c", "h", "cpp",
+    "rs", "go", "sh", "sql", "tex",
+}
+
+
+def _looks_like_text(path: str) -> bool:
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    if b"\0" in head:
+        return False
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is fine
+        return e.start >= len(head) - 3
+    return True
+
+
+def _pdf_text(path: str) -> str:
+    if PdfReader is None:
+        return ""
+    parts, length = [], 0
+    for page in PdfReader(path).pages:
+        text = page.extract_text() or ""
+        parts.append(text)
+        length += len(text)
+        if length >= MAX_TEXT_CHARS:
+            break
+    return "\n".join(parts)[:MAX_TEXT_CHARS]
+
+
+def extract_text(path: str) -> str:
+    """Return the searchable text of a file, or an empty string if it has none."""
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    if ext == "pdf":
+        return _pdf_text(path)
+    if ext not in TEXT_EXTENSIONS and not _looks_like_text(path):
+        return ""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read(MAX_TEXT_CHARS)
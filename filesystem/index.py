@@ -0,0 +1,319 @@
+"""Persistent metadata index of uploaded files."""
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import time
+
+from filesystem.media import derived_dir_for, get_pool, process_file
+from filesystem.storage import UPLOAD_DIR
+from utils.env_utils import get_db_dir
+from utils.sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_owner ON files(owner, mtime);
+CREATE INDEX IF NOT EXISTS idx_files_ext ON files(ext, mtime);
+CREATE INDEX IF NOT EXISTS idx_files_mtime ON files(mtime);
+CREATE INDEX IF NOT EXISTS idx_files_sha256 ON files(sha256);
+CREATE TABLE IF NOT EXISTS texts (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    chars INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS file_text USING fts5(content, tokenize='porter unicode61');
+CREATE TABLE IF NOT EXISTS derivatives (
+    sha256 TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (sha256, kind)
+);
+"""
+
+# Default number of results returned by a search
+SEARCH_LIMIT = 5
+# Tokens of context in each search snippet
+SNIPPET_TOKENS = 24
+# Characters of extracted text returned when describing a file
+EXCERPT_CHARS = 4000
+
+
+def _extension(filename: str) -> str:
+    return os.path.splitext(filename)[1].lstrip(".").lower()
+
+
+def _match_expression(query: str) -> str:
+    """Turn free text into an FTS5 query matching any of its terms."""
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    return " OR ".join(terms)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _scan_uploads(known: dict[str, tuple[int, float]]) -> tuple[list[tuple], list[str]]:
+    """Compare the upload directory with the ``known`` (size, mtime) of indexed paths.
+
+    Returns (path, owner, size, mtime, sha256) of new and changed files, and
+    the indexed paths that no longer exist.
+    """
+    seen = set()
+    changed = []
+    if os.path.isdir(UPLOAD_DIR):
+        for owner_entry in os.scandir(UPLOAD_DIR):
+            if owner_entry.name.startswith(".") or not owner_entry.is_dir():
+                continue
+            for entry in os.scandir(owner_entry.path):
+                # Dotfiles and the temporary links made while storing an upload
+                if entry.name.startswith(".") or entry.name.endswith(".tmp") or not entry.is_file():
+                    continue
+                seen.add(entry.path)
+                try:
+                    stat = entry.stat()
+                    if known.get(entry.path) != (stat.st_size, stat.st_mtime):
+                        changed.append(
+                            (entry.path, owner_entry.name, stat.st_size, stat.st_mtime, _hash_file(entry.path))
+                        )
+                except OSError as e:
+                    logger.warning(f"Could not index {entry.path}: {e}")
+    removed = [path for path in known if path not in seen]
+    return changed, removed
+
+
+class FileIndex(SQLiteStore):
+    """SQLite index of path, owner, size, mtime and content hash of uploads.
+
+    Updated whenever a file is uploaded and reconciled periodically against
+    the upload directory, so listing files never has to walk the NAS.
+
+    Each new upload is post-processed once per content hash in a process
+    pool: its text is extracted into an FTS5 table ranked with BM25, and
+    images get size-bounded derivatives. Both are cached here so later
+    questions reuse them instead of reprocessing the original.
+    """
+
+    SCHEMA = INDEX_SCHEMA
+
+    def __init__(self, path: str, workers: int = 2):
+        super().__init__(path)
+        self.workers = workers
+
+    def _upsert(self, path: str, owner: str, sha256: str | None = None):
+        stat = os.stat(path)
+        if sha256 is None:
+            sha256 = _hash_file(path)
+        filename = os.path.basename(path)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files (path, owner, filename, ext, size, mtime, sha256) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path, owner, filename, _extension(filename), stat.st_size, stat.st_mtime, sha256),
+        )
+
+    def _query(self, owner: str | None, ext: str | None, since: float | None, limit: int, offset: int):
+        clauses, params = [], []
+        if owner:
+            clauses.append("owner = ?")
+            params.append(owner)
+        if ext:
+            clauses.append("ext = ?")
+            params.append(ext.lstrip(".").lower())
+        if since:
+            clauses.append("mtime >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        total = self._conn.execute(f"SELECT COUNT(*) FROM files {where}", params).fetchone()[0]
+        rows = self._conn.execute(
+            f"SELECT path, owner, filename, size, mtime, sha256 FROM files {where} "
+            "ORDER BY mtime DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+        keys = ("path", "owner", "filename", "size", "mtime", "sha256")
+        return [dict(zip(keys, row)) for row in rows], total
+
+    def _known(self) -> dict[str, tuple[int, float]]:
+        return {
+            path: (size, mtime)
+            for path, size, mtime in self._conn.execute("SELECT path, size, mtime FROM files")
+        }
+
+    def _apply_scan(self, changed: list[tuple], removed: list[str]):
+        """Write the results of ``_scan_uploads`` to the index."""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO files (path, owner, filename, ext, size, mtime, sha256) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (path, owner, os.path.basename(path), _extension(path), size, mtime, sha256)
+                for path, owner, size, mtime, sha256 in changed
+            ],
+        )
+        self._conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+        self._prune_text()
+
+    def _is_processed(self, sha256: str) -> bool:
+        return self._conn.execute("SELECT 1 FROM texts WHERE sha256 = ?", (sha256,)).fetchone() is not None
+
+    def _store_result(self, sha256: str, result: dict):
+        if self._is_processed(sha256):
+            return
+        text = result["text"]
+        cursor = self._conn.execute("INSERT INTO texts (sha256, chars) VALUES (?, ?)", (sha256, len(text)))
+        self._conn.execute("INSERT INTO file_text (rowid, content) VALUES (?, ?)", (cursor.lastrowid, text))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO derivatives (sha256, kind, path, width, height, size) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(sha256, d["kind"], d["path"], d["width"], d["height"], d["size"]) for d in result["derivatives"]],
+        )
+
+    def _prune_text(self):
+        """Drop text and derivatives whose content is no longer referenced by any file."""
+        orphans = self._conn.execute(
+            "SELECT id, sha256 FROM texts WHERE sha256 NOT IN (SELECT sha256 FROM files)"
+        ).fetchall()
+        self._conn.executemany("DELETE FROM file_text WHERE rowid = ?", [(i,) for i, _ in orphans])
+        self._conn.executemany("DELETE FROM texts WHERE id = ?", [(i,) for i, _ in orphans])
+        self._conn.executemany("DELETE FROM derivatives WHERE sha256 = ?", [(sha,) for _, sha in orphans])
+        for _, sha256 in orphans:
+            shutil.rmtree(derived_dir_for(sha256), ignore_errors=True)
+
+    def _derivatives(self, sha256s: list[str]) -> dict[str, dict[str, str]]:
+        placeholders = ",".join("?" * len(sha256s))
+        rows = self._conn.execute(
+            f"SELECT sha256, kind, path FROM derivatives WHERE sha256 IN ({placeholders})", sha256s
+        ).fetchall()
+        derivatives: dict[str, dict[str, str]] = {}
+        for sha256, kind, path in rows:
+            derivatives.setdefault(sha256, {})[kind] = path
+        return derivatives
+
+    def _describe(self, path: str) -> dict | None:
+        row = self._conn.execute(
+            "SELECT path, owner, filename, size, mtime, sha256 FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            return None
+        info = dict(zip(("path", "owner", "filename", "size", "mtime", "sha256"), row))
+        text = self._conn.execute(
+            "SELECT t.chars, substr(file_text.content, 1, ?) FROM texts t "
+            "JOIN file_text ON file_text.rowid = t.id WHERE t.sha256 = ?",
+            (EXCERPT_CHARS, info["sha256"]),
+        ).fetchone()
+        info["processed"] = text is not None
+        info["text_chars"], info["text"] = text if text else (0, "")
+        info["derivatives"] = [
+            dict(zip(("kind", "path", "width", "height", "size"), d))
+            for d in self._conn.execute(
+                "SELECT kind, path, width, height, size FROM derivatives WHERE sha256 = ?", (info["sha256"],)
+            )
+        ]
+        return info
+
+    def _unindexed(self) -> list[tuple[str, str]]:
+        return self._conn.execute(
+            "SELECT MIN(path), sha256 FROM files "
+            "WHERE sha256 NOT IN (SELECT sha256 FROM texts) GROUP BY sha256"
+        ).fetchall()
+
+    def _search(self, expression: str, owner: str | None, limit: int):
+        owner_clause = "AND f.owner = ?" if owner else ""
+        rows = self._conn.execute(
+            f"SELECT f.path, f.owner, f.filename, f.sha256, snippet(file_text, 0, '**', '**', '…', ?), bm25(file_text) "
+            "FROM file_text JOIN texts t ON t.id = file_text.rowid JOIN files f ON f.sha256 = t.sha256 "
+            f"WHERE file_text MATCH ? {owner_clause} ORDER BY bm25(file_text) LIMIT ?",
+            (SNIPPET_TOKENS, expression, *([owner] if owner else []), limit),
+        ).fetchall()
+        return [
+            {
+                "path": path,
+                "owner": owner,
+                "filename": filename,
+                "sha256": sha256,
+                "snippet": snippet,
+                "score": round(-score, 3),
+            }
+            for path, owner, filename, sha256, snippet, score in rows
+        ]
+
+    async def record(self, path: str, owner: str, sha256: str | None = None):
+        """Index a single file, typically right after it was uploaded."""
+        await self._call(self._upsert, path, owner, sha256)
+
+    async def query(
+        self,
+        owner: str | None = None,
+        ext: str | None = None,
+        since: float | None = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> tuple[list[dict], int]:
+        """Return one page of matching files, newest first, and the total match count."""
+        return await self._call(self._query, owner, ext, since, limit, offset)
+
+    async def process(self, path: str, sha256: str):
+        """Extract text and build derivatives for a file unless its content was already processed."""
+        if await self._call(self._is_processed, sha256):
+            return
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        result = await loop.run_in_executor(get_pool(self.workers), process_file, path, sha256)
+        if result["error"]:
+            # Still recorded, so a file that cannot be processed is not retried on every scan
+            logger.warning(f"Could not process {path}: {result['error']}")
+        await self._call(self._store_result, sha256, result)
+        logger.info(
+            f"Processed {path} in {time.perf_counter() - start:.2f}s: {len(result['text'])} characters, "
+            f"{len(result['derivatives'])} derivative(s)"
+        )
+
+    async def search(self, query: str, owner: str | None = None, limit: int = SEARCH_LIMIT) -> list[dict]:
+        """Full-text search over uploaded files, best BM25 matches first."""
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        results = await self._call(self._search, expression, owner, limit)
+        if results:
+            derivatives = await self._call(self._derivatives, [r["sha256"] for r in results])
+            for result in results:
+                result["derivatives"] = derivatives.get(result.pop("sha256"), {})
+        return results
+
+    async def describe(self, path: str) -> dict | None:
+        """Return the metadata, cached text excerpt and derivatives of an indexed file."""
+        return await self._call(self._describe, path)
+
+    async def reconcile(self):
+        """Scan the upload directory and fix up added, changed and removed files."""
+        start = time.perf_counter()
+        known = await self._call(self._known)
+        # Walking and hashing the NAS happens outside the store lock
+        changed, removed = await asyncio.to_thread(_scan_uploads, known)
+        await self._call(self._apply_scan, changed, removed)
+        updated, removed = len(changed), len(removed)
+        unindexed = await self._call(self._unindexed)
+        await asyncio.gather(*(self.process(path, sha256) for path, sha256 in unindexed))
+        logger.info(
+            f"Reconciled file index in {time.perf_counter() - start:.2f}s: "
+            f"{updated} updated, {removed} removed, {len(unindexed)} processed"
+        )
+
+
+# Index shared by the upload and list commands
+file_index = FileIndex(os.path.join(get_db_dir(), "files.db"))
@@ -0,0 +1,92 @@
+"""Post-processing of uploads: thumbnails, previews and text extraction.
+
+Processing is CPU bound, so ``process_file`` runs in a separate process
+pool and must stay a picklable module-level function.
+"""
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+
+from filesystem.extract import extract_text
+from filesystem.storage import UPLOAD_DIR
+
+# Derivatives are stored once per content hash
+DERIVED_DIR = os.path.join(UPLOAD_DIR, ".derived")
+
+# Bounding boxes of the generated derivatives, in pixels
+DERIVATIVE_SIZES = {
+    "thumbnail": (256, 256),
+    "preview": (1600, 1600),
+}
+JPEG_QUALITY = 85
+
+# Refuse to decode images larger than this (decompression bombs)
+Image.MAX_IMAGE_PIXELS = 100_000_000
+
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "bmp", "webp", "tif", "tiff", "heic"}
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_pool(workers: int = 2) -> ProcessPoolExecutor:
+    """Return the shared process pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        # Spawned workers do not inherit the bot's threads and open sockets
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def derived_dir_for(sha256: str) -> str:
+    """Return the directory holding the derivatives of a blob."""
+    return os.path.join(DERIVED_DIR, sha256[:2], sha256)
+
+
+def _save_derivative(image: Image.Image, kind: str, directory: str) -> dict:
+    derivative = image.copy()
+    derivative.thumbnail(DERIVATIVE_SIZES[kind], Image.Resampling.LANCZOS)
+    path = os.path.join(directory, f"{kind}.jpg")
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    derivative.save(tmp_path, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    os.replace(tmp_path, path)
+    return {
+        "kind": kind,
+        "path": path,
+        "width": derivative.width,
+        "height": derivative.height,
+        "size": os.path.getsize(path),
+    }
+
+
+def _image_derivatives(path: str, sha256: str) -> list[dict]:
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    directory = derived_dir_for(sha256)
+    os.makedirs(directory, exist_ok=True)
+    derivatives = [_save_derivative(image, "thumbnail", directory)]
+    max_width, max_height = DERIVATIVE_SIZES["preview"]
+    # Small images are already fine to hand to the agent as they are
+    if image.width > max_width or image.height > max_height or os.path.getsize(path) > 1 << 20:
+        derivatives.append(_save_derivative(image, "preview", directory))
+    return derivatives
+
+
+def process_file(path: str, sha256: str) -> dict:
+    """Extract text and generate derivatives for one file.
+
+    Runs in a worker process. Returns a dict with the extracted ``text`` and a
+    list of ``derivatives``; a file that cannot be processed yields neither.
+    """
+    result = {"text": "", "derivatives": [], "error": None}
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    try:
+        if ext in IMAGE_EXTENSIONS:
+            result["derivatives"] = _image_derivatives(path, sha256)
+        else:
+            result["text"] = extract_text(path)
+    except Exception as e:  # One bad file must not take down the worker
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
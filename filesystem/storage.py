@@ -0,0 +1,115 @@
+"""Content-addressed storage for uploaded files."""
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from dataclasses import dataclass
+
+import aiohttp
+import discord
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "/data/uploads"
+# Blobs are stored once per content hash; user files link to them
+BLOB_DIR = os.path.join(UPLOAD_DIR, ".blobs")
+CHUNK_SIZE = 1 << 20
+
+_session: aiohttp.ClientSession | None = None
+
+
+@dataclass
+class StoredFile:
+    """Result of storing an upload."""
+
+    path: str
+    blob_path: str
+    sha256: str
+    size: int
+    deduplicated: bool
+
+
+def _get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession()
+    return _session
+
+
+async def close():
+    """Close the HTTP session used for downloading attachments."""
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+def blob_path_for(sha256: str) -> str:
+    """Return where the blob with the given content hash is stored."""
+    return os.path.join(BLOB_DIR, sha256[:2], sha256)
+
+
+def _write_chunk(f, digest, chunk: bytes):
+    f.write(chunk)
+    digest.update(chunk)
+
+
+def _commit_blob(local_path: str, blob_path: str) -> bool:
+    """Move a downloaded file into the blob store; return True if it already existed."""
+    try:
+        if os.path.exists(blob_path):
+            return True
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        tmp_path = f"{blob_path}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(local_path, tmp_path)
+        os.replace(tmp_path, blob_path)
+        return False
+    finally:
+        os.remove(local_path)
+
+
+def _link(blob_path: str, path: str):
+    """Atomically point ``path`` at a blob, preferring a hard link."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path) and os.path.samefile(path, blob_path):
+        return
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(blob_path, tmp_path)
+    except OSError:
+        os.symlink(os.path.relpath(blob_path, os.path.dirname(path)), tmp_path)
+    os.replace(tmp_path, path)
+
+
+async def store_attachment(attachment: discord.Attachment, owner: str) -> StoredFile:
+    """Stream an attachment to the blob store and link it as ``owner/filename``.
+
+    The download is written in chunks to a local temporary file by a worker
+    thread while being hashed, so the event loop never blocks on disk I/O. Only
+    content not yet in the store is copied to the NAS, and the final blob and
+    user link are both created atomically with a rename.
+    """
+    fd, local_path = tempfile.mkstemp(prefix="upload-")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async with _get_session().get(attachment.url) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    await asyncio.to_thread(_write_chunk, f, digest, chunk)
+                    size += len(chunk)
+    except BaseException:
+        os.remove(local_path)
+        raise
+
+    sha256 = digest.hexdigest()
+    blob_path = blob_path_for(sha256)
+    deduplicated = await asyncio.to_thread(_commit_blob, local_path, blob_path)
+    path = os.path.join(UPLOAD_DIR, owner, os.path.basename(attachment.filename))
+    await asyncio.to_thread(_link, blob_path, path)
+    logger.info(f"Stored {path} ({size} bytes, sha256 {sha256[:12]}, deduplicated={deduplicated})")
+    return StoredFile(path, blob_path, sha256, size, deduplicated)
@@ -0,0 +1,250 @@
+"""Offline load test for /ask.
+
+Fires synthetic interactions into ``AICog.cmd_ask`` at a fixed arrival rate,
+with the OpenAI API replaced by a local fake server and the MCP servers by
+stub stdio processes, then reports throughput and per-stage latency.
+
+Run from the repository root, for example:
+
+    python -m loadtest.driver --rate 5 --duration 60 --script search_nodes,read_file
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Keep every store the bot opens away from the real data volume; this must
+# happen before any bot module is imported
+_workdir = tempfile.mkdtemp(prefix="loadtest-")
+os.environ.setdefault("DB_DIR", _workdir)
+os.environ.setdefault("OPENAI_API_KEY", "loadtest")
+# The stand-ins are patched into this process, so agent runs must stay here
+os.environ["AGENT_WORKERS"] = "0"
+
+STUB_MCP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub_mcp.py")
+QUESTIONS = [
+    "When is the next bingo game and who is playing?",
+    "What are the rules for a full row?",
+    "Summarize what {mention} said about the last game.",
+    "Can you remind me what I told you about my card?",
+]
+
+
+class FakeMessage:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def edit(self, content: str | None = None, **kwargs):
+        await asyncio.sleep(self.delay)
+
+    async def delete(self):
+        await asyncio.sleep(self.delay)
+
+
+class FakeResponse:
+    async def defer(self, **kwargs):
+        pass
+
+    async def send_message(self, *args, **kwargs):
+        pass
+
+
+class FakeFollowup:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def send(self, content: str | None = None, **kwargs) -> FakeMessage:
+        await asyncio.sleep(self.delay)
+        return FakeMessage(self.delay)
+
+
+def make_interaction(guild, user, channel_id: int, discord_delay: float):
+    from tests.benchmarks.fakes import FakeInteraction
+
+    interaction = FakeInteraction(user, guild, channel_id)
+    interaction.response = FakeResponse()
+    interaction.followup = FakeFollowup(discord_delay)
+    return interaction
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def configure(args, base_url: str):
+    """Point the agents SDK, MCP servers and history at the local stand-ins."""
+    import agents
+    from openai import AsyncOpenAI
+
+    from ai import instrumentation, interface, utils
+    from ai.history import HistoryStore
+
+    client = AsyncOpenAI(base_url=base_url, api_key="loadtest")
+    agents.set_default_openai_client(client, use_for_tracing=False)
+    agents.set_default_openai_api("chat_completions")
+    # Replace the OpenAI trace exporter; only the in-process metrics are kept
+    agents.set_trace_processors([instrumentation.MetricsTracingProcessor()])
+    instrumentation._installed = True
+    os.environ["OPENAI_BASE_URL"] = base_url
+
+    env = {**os.environ, "STUB_MCP_DELAY": str(args.mcp_delay)}
+    for kind in utils.MCP_SERVER_PARAMS:
+        utils.MCP_SERVER_PARAMS[kind] = {"command": sys.executable, "args": [STUB_MCP, kind], "env": env}
+    interface.interaction_history = HistoryStore(
+        os.path.join(_workdir, "history"), budget_tokens=args.history_budget, model="fake"
+    )
+
+
+async def run(args) -> dict:
+    from ai.cog import AICog
+    from ai.commands import query
+    from ai.interface import mcp_pool
+    from loadtest.fake_openai import FakeOpenAI
+    from tests.benchmarks.fakes import make_guild
+    from utils.roster import roster_cache
+    from utils.tracing import metrics, request_trace
+
+    fake = FakeOpenAI(args.script, args.first_token_delay, args.token_delay, args.answer_tokens)
+    configure(args, await fake.start())
+
+    traces: list[list[tuple[str, float]]] = []
+
+    @contextmanager
+    def capturing_trace(name: str):
+        with request_trace(name) as trace:
+            yield trace
+        traces.append(trace)
+
+    query.request_trace = capturing_trace
+
+    guilds = [make_guild(args.members, guild_id=idx + 1) for idx in range(args.guilds)]
+    for guild in guilds:
+        await roster_cache.get(guild)
+    await mcp_pool.start()
+    cog = AICog(bot=None)
+    rng = random.Random(args.seed)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one_request(idx: int):
+        nonlocal errors
+        guild = rng.choice(guilds)
+        user = guild.members[rng.randrange(min(args.users, len(guild.members)))]
+        other = rng.choice(guild.members)
+        question = rng.choice(QUESTIONS).format(mention=other.mention)
+        if args.unique:
+            question = f"{question} (#{idx})"
+        interaction = make_interaction(guild, user, rng.randrange(args.channels), args.discord_delay)
+        start = time.perf_counter()
+        try:
+            await cog.cmd_ask.callback(cog, interaction, question, args.command)
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors += 1
+            print(f"Request {idx} failed: {e}", file=sys.stderr)
+
+    tasks = []
+    started = time.perf_counter()
+    total = int(args.rate * args.duration)
+    for idx in range(total):
+        tasks.append(asyncio.create_task(one_request(idx)))
+        # Poisson arrivals at the requested mean rate
+        await asyncio.sleep(rng.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    components = {
+        name + "".join(f"[{value}]" for _, value in labels): value
+        for (name, labels), value in metrics.gauges().items()
+    }
+    await mcp_pool.close()
+
+    tokens = {dict(labels)["type"]: value for labels, value in metrics.counters("llm_tokens_total").items()}
+    input_tokens, cached = tokens.get("input", 0), tokens.get("cached", 0)
+
+    stages: dict[str, list[float]] = {}
+    for trace in traces:
+        for name, seconds in trace:
+            stages.setdefault(name, []).append(seconds)
+    report = {
+        "requests": total,
+        "completed": len(latencies),
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "llm_requests": fake.requests,
+        "cached_token_rate": cached / input_tokens if input_tokens else 0.0,
+        "stages": {
+            name: {
+                "count": len(values),
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "p99": percentile(values, 0.99),
+            }
+            for name, values in sorted({"end_to_end": latencies, **stages}.items())
+        },
+        "components": components,
+    }
+    return report
+
+
+def print_report(report: dict):
+    print(
+        f"\n{report['completed']}/{report['requests']} completed, {report['errors']} errors in "
+        f"{report['elapsed']:.1f}s: {report['throughput']:.2f} req/s, {report['llm_requests']} LLM requests, "
+        f"{report['cached_token_rate']:.0%} of input tokens cached\n"
+    )
+    print(f"{'stage':<32}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, stage in report["stages"].items():
+        print(f"{name:<32}{stage['count']:>8}{stage['p50']:>10.3f}{stage['p95']:>10.3f}{stage['p99']:>10.3f}")
+    print()
+    for name, value in sorted(report["components"].items()):
+        if name.startswith(("scheduler_", "mcp_pool_", "mcp_tool_cache_")):
+            print(f"{name:<48}{value:>10.3g}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=2.0, help="mean arrivals per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to keep sending requests")
+    parser.add_argument(
+        "--script",
+        type=lambda s: [tool for tool in s.split(",") if tool],
+        default=["search_nodes", "read_file"],
+        help="comma-separated tools the fake model calls before answering",
+    )
+    parser.add_argument("--first-token-delay", type=float, default=0.5, help="seconds before each model reply starts")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed tokens")
+    parser.add_argument("--answer-tokens", type=int, default=80)
+    parser.add_argument("--mcp-delay", type=float, default=0.05, help="seconds per stub MCP tool call")
+    parser.add_argument("--discord-delay", type=float, default=0.05, help="seconds per Discord API call")
+    parser.add_argument("--guilds", type=int, default=1)
+    parser.add_argument("--members", type=int, default=1000, help="members per guild")
+    parser.add_argument("--users", type=int, default=50, help="distinct users asking per guild")
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--command", default=None, help="command name passed to /ask")
+    parser.add_argument("--history-budget", type=int, default=2000)
+    parser.add_argument("--unique", action="store_true", help="make every question unique (no coalescing)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Every conversation follows a script: the first turns each call one scripted
+tool (when the agent offers it), then the model answers with text. Latency
+before the first token and between streamed tokens is configurable. Usage
+reports cached tokens like the real API does: the longest prefix shared
+with a recent prompt, in 128-token steps once it reaches 1024 tokens.
+"""
+import asyncio
+import itertools
+import json
+import os
+import time
+from collections import deque
+
+from aiohttp import web
+
+# Arguments used when a scripted tool is called
+DEFAULT_ARGUMENTS = {
+    "search_nodes": {"query": "bingo"},
+    "open_nodes": {"names": ["sysprompt"]},
+    "read_graph": {"limit": 20, "offset": 0},
+    "search_uploads": {"query": "bingo rules", "owner": None, "limit": 5},
+    "read_file": {"path": "/data/uploads/rules.txt"},
+    "list_directory": {"path": "/data/uploads"},
+    "sequentialthinking": {
+        "thought": "Work out the answer step by step.",
+        "nextThoughtNeeded": False,
+        "thoughtNumber": 1,
+        "totalThoughts": 1,
+    },
+}
+
+# Recent prompts compared against for cached prefixes
+PROMPT_MEMORY = 64
+
+ANSWER_WORDS = "The next bingo game starts on Friday and the card has twenty five squares".split()
+
+
+class FakeOpenAI:
+    """aiohttp application serving ``POST /v1/chat/completions``."""
+
+    def __init__(
+        self,
+        script: list[str],
+        first_token_delay: float = 0.5,
+        token_delay: float = 0.01,
+        answer_tokens: int = 80,
+    ):
+        self.script = script
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.answer_tokens = answer_tokens
+        self.requests = 0
+        self._ids = itertools.count()
+        self._prompts: deque[str] = deque(maxlen=PROMPT_MEMORY)
+        self.app = web.Application()
+        self.app.router.add_post("/v1/chat/completions", self.chat_completions)
+
+    def _next_tool(self, body: dict) -> str | None:
+        offered = {tool["function"]["name"] for tool in body.get("tools") or []}
+        step = sum(1 for message in body["messages"] if message.get("role") == "assistant" and message.get("tool_calls"))
+        if step < len(self.script) and self.script[step] in offered:
+            return self.script[step]
+        return None
+
+    def _cached_tokens(self, prompt: str) -> int:
+        shared = max((len(os.path.commonprefix([prompt, old])) for old in self._prompts), default=0)
+        self._prompts.append(prompt)
+        tokens = shared // 4
+        return tokens // 128 * 128 if tokens >= 1024 else 0
+
+    def _answer(self) -> list[str]:
+        words = list(itertools.islice(itertools.cycle(ANSWER_WORDS), self.answer_tokens))
+        return [word + " " for word in words]
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.requests += 1
+        completion_id = f"chatcmpl-{next(self._ids)}"
+        tool = self._next_tool(body)
+        prompt = json.dumps([body.get("tools"), body["messages"]])
+        prompt_tokens = len(prompt) // 4
+        cached_tokens = self._cached_tokens(prompt)
+        await asyncio.sleep(self.first_token_delay)
+
+        if tool:
+            tool_call = {
+                "id": f"call_{completion_id}",
+                "type": "function",
+                "function": {"name": tool, "arguments": json.dumps(DEFAULT_ARGUMENTS.get(tool, {}))},
+            }
+            message = {"role": "assistant", "content": None, "tool_calls": [tool_call]}
+            tokens, finish_reason = [], "tool_calls"
+        else:
+            tokens = self._answer()
+            message, finish_reason = {"role": "assistant", "content": "".join(tokens)}, "stop"
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": max(len(tokens), 20),
+            "total_tokens": prompt_tokens + max(len(tokens), 20),
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+        base = {"id": completion_id, "created": int(time.time()), "model": body.get("model", "fake")}
+
+        if not body.get("stream"):
+            return web.json_response({
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        async def send(choices: list, **extra):
+            chunk = {**base, "object": "chat.completion.chunk", "choices": choices, **extra}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        try:
+            if tool:
+                delta = {"role": "assistant", "tool_calls": [{"index": 0, **tool_call}]}
+                await send([{"index": 0, "delta": delta, "finish_reason": None}])
+            for token in tokens:
+                await send([{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+                await asyncio.sleep(self.token_delay)
+            await send([{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+            await send([], usage=usage)
+            await response.write(b"data: [DONE]\n\n")
+        except ConnectionResetError:
+            pass  # The client gave up, e.g. at its deadline
+        return response
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve in the running loop and return the base URL for the OpenAI client."""
+        runner = web.AppRunner(self.app)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/v1"
@@ -0,0 +1,54 @@
+"""Stub stdio MCP servers standing in for the filesystem and thinking servers.
+
+Usage: ``python loadtest/stub_mcp.py filesystem|thinking``. Every tool call
+sleeps for ``STUB_MCP_DELAY`` seconds (default 0.05) before answering.
+"""
+import asyncio
+import os
+import sys
+
+from mcp.server.fastmcp import FastMCP
+
+DELAY = float(os.getenv("STUB_MCP_DELAY", "0.05"))
+
+
+def filesystem_server() -> FastMCP:
+    server = FastMCP("filesystem", log_level="WARNING")
+
+    @server.tool()
+    async def read_file(path: str) -> str:
+        """Read the complete contents of a file."""
+        await asyncio.sleep(DELAY)
+        return f"Contents of {path}: each player gets a five by five card; the first full row wins."
+
+    @server.tool()
+    async def list_directory(path: str) -> str:
+        """List the files and directories in a path."""
+        await asyncio.sleep(DELAY)
+        return "\n".join(f"[FILE] file{idx}.txt" for idx in range(20))
+
+    @server.tool()
+    async def list_allowed_directories() -> str:
+        """List the directories this server may access."""
+        return "/data"
+
+    return server
+
+
+def thinking_server() -> FastMCP:
+    server = FastMCP("thinking", log_level="WARNING")
+
+    @server.tool()
+    async def sequentialthinking(
+        thought: str, nextThoughtNeeded: bool, thoughtNumber: int, totalThoughts: int
+    ) -> str:
+        """Record one step of a structured reasoning process."""
+        await asyncio.sleep(DELAY)
+        return f'{{"thoughtNumber": {thoughtNumber}, "totalThoughts": {totalThoughts}, "nextThoughtNeeded": false}}'
+
+    return server
+
+
+if __name__ == "__main__":
+    servers = {"filesystem": filesystem_server, "thinking": thinking_server}
+    servers[sys.argv[1]]().run()
@@ -7,9 +7,6 @@ mkdir -p /data
 chmod 777 /data
 echo "Data directory permissions set"
 
-# Set memory file path for memory server
-export MEMORY_FILE_PATH="/data/memory.json"
-
 # Node.js settings for MCP server stability
 export NODE_OPTIONS="--max-old-space-size=512 --no-deprecation"
 export UV_THREADPOOL_SIZE=128
@@ -1,10 +1,14 @@
 #!/bin/bash
 
 echo "=== Bot Log ==="
-if [ -f "./data/bot.log" ]; then
-    tail -n 50 ./data/bot.log
-else
-    echo "No bot.log found"
+# The bot writes JSON lines to local disk inside the container; /data/logs
+# only holds the periodically shipped copy
+if ! docker exec bingobot tail -n 50 /app/logs/bot.log 2>/dev/null; then
+    if [ -f "./data/logs/bot.log" ]; then
+        tail -n 50 ./data/logs/bot.log
+    else
+        echo "No bot.log found"
+    fi
 fi
 
 echo -e "\n=== MCP Server Log ==="
@@ -0,0 +1,29 @@
+"""Fixtures for the hot-path benchmarks.
+
+Run from the repository root with the dev dependency group installed:
+
+    python -m pytest tests/benchmarks --benchmark-save=baseline
+    python -m pytest tests/benchmarks --benchmark-compare --benchmark-compare-fail=median:15%
+
+Results are stored as JSON under ``tests/benchmarks/baselines``, as set in
+``pyproject.toml``; the committed baseline is what ``--benchmark-compare``
+compares against.
+"""
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+# Stores opened at import time must not touch the real data volume
+os.environ.setdefault("DB_DIR", tempfile.mkdtemp(prefix="bench-db-"))
+
+
+@pytest.fixture(scope="session")
+def event_loop_runner():
+    """Run coroutines on one long-lived loop so benchmarks exclude loop start-up."""
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
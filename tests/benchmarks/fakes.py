@@ -0,0 +1,79 @@
+"""Discord stand-ins and data generators for the benchmarks."""
+import random
+import string
+
+MEMBER_COUNTS = [10, 100, 1_000, 10_000, 50_000]
+
+
+class FakeUser:
+    """Just enough of ``discord.Member`` for the mention helpers."""
+
+    def __init__(self, user_id: int, name: str, display_name: str | None = None, guild=None):
+        self.id = user_id
+        self.name = name
+        self.display_name = display_name or name
+        self.guild = guild
+
+    @property
+    def mention(self) -> str:
+        return f"<@{self.id}>"
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class FakeGuild:
+    """A chunked guild whose REST lookups return immediately."""
+
+    def __init__(self, guild_id: int, members: list[FakeUser]):
+        self.id = guild_id
+        self.members = members
+        self.chunked = True
+        self._by_id = {member.id: member for member in members}
+
+    def get_member(self, user_id: int) -> FakeUser | None:
+        return self._by_id.get(user_id)
+
+    async def fetch_member(self, user_id: int) -> FakeUser:
+        return self._by_id.get(user_id) or FakeUser(user_id, f"fetched{user_id}", guild=self)
+
+    async def chunk(self):
+        pass
+
+
+class FakeInteraction:
+    """Interaction carrying a user, guild and channel."""
+
+    def __init__(self, user: FakeUser, guild: FakeGuild, channel_id: int = 1):
+        self.id = random.getrandbits(63)
+        self.user = user
+        self.guild = guild
+        self.channel = type("FakeChannel", (), {"id": channel_id})()
+
+
+def make_members(count: int, guild=None, seed: int = 0) -> list[FakeUser]:
+    """Create members with unique, realistic-looking usernames."""
+    rng = random.Random(seed)
+    members = []
+    for idx in range(count):
+        stem = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+        members.append(FakeUser(10**17 + idx, f"{stem}{idx}", f"{stem.title()} {idx}", guild))
+    return members
+
+
+def make_guild(member_count: int, guild_id: int | None = None) -> FakeGuild:
+    """Create a guild with ``member_count`` members; IDs are unique per member count."""
+    guild = FakeGuild(guild_id or member_count, [])
+    guild.members = make_members(member_count, guild)
+    guild._by_id = {member.id: member for member in guild.members}
+    return guild
+
+
+def make_text(words: int, names: list[str], mention_every: int = 20, seed: int = 0) -> str:
+    """Create prose of ``words`` words that names a member every ``mention_every`` words."""
+    rng = random.Random(seed)
+    vocabulary = ["the", "bingo", "game", "card", "called", "number", "winner", "row", "today", "again"]
+    out = []
+    for idx in range(words):
+        out.append(rng.choice(names) if names and idx % mention_every == 0 else rng.choice(vocabulary))
+    return " ".join(out)
@@ -0,0 +1,88 @@
+"""Benchmarks for mention conversion and the small parsing helpers."""
+import pytest
+
+from tests.benchmarks.fakes import MEMBER_COUNTS, FakeInteraction, FakeUser, make_guild, make_text
+from utils import discord_utils
+from utils.discord_utils import format_username, parse_player_ids, resolve_mentions, restore_mentions
+from utils.roster import roster_cache
+
+RESPONSE_WORDS = [50, 500, 5_000]
+MENTIONS_PER_QUESTION = [1, 10, 50]
+
+
+@pytest.fixture(scope="module", params=MEMBER_COUNTS, ids=lambda n: f"members={n}")
+def guild(request, event_loop_runner):
+    guild = make_guild(request.param)
+    roster_cache.forget(guild.id)
+    # Load the roster up front; steady state is a warm roster
+    event_loop_runner(roster_cache.get(guild))
+    return guild
+
+
+@pytest.mark.parametrize("mentions", MENTIONS_PER_QUESTION, ids=lambda n: f"mentions={n}")
+def test_resolve_mentions_roster(benchmark, event_loop_runner, guild, mentions):
+    interaction = FakeInteraction(guild.members[0], guild)
+    users = guild.members[:mentions]
+    text = "Who won? " + " and ".join(user.mention for user in users)
+
+    result = benchmark(lambda: event_loop_runner(resolve_mentions(interaction, text)))
+    assert users[-1].name in result
+
+
+@pytest.mark.parametrize("mentions", MENTIONS_PER_QUESTION, ids=lambda n: f"mentions={n}")
+def test_resolve_mentions_rest_fallback(benchmark, event_loop_runner, mentions):
+    """Mentioned users missing from the roster, looked up over (instant) REST."""
+    guild = make_guild(10, guild_id=1)
+    roster_cache.forget(guild.id)
+    event_loop_runner(roster_cache.get(guild))
+    interaction = FakeInteraction(guild.members[0], guild)
+    text = " ".join(f"<@{10**18 + idx}>" for idx in range(mentions))
+
+    def run():
+        return event_loop_runner(resolve_mentions(interaction, text))
+
+    result = benchmark.pedantic(run, setup=discord_utils.mention_name_cache.clear, rounds=200, warmup_rounds=5)
+    assert f"fetched{10**18}" in result
+
+
+@pytest.mark.parametrize("words", RESPONSE_WORDS, ids=lambda n: f"words={n}")
+def test_restore_mentions(benchmark, event_loop_runner, guild, words):
+    interaction = FakeInteraction(guild.members[0], guild)
+    names = [member.name for member in guild.members[:50]]
+    response = make_text(words, names)
+
+    result = benchmark(lambda: event_loop_runner(restore_mentions(interaction, response)))
+    assert "<@" in result
+
+
+@pytest.mark.parametrize("words", RESPONSE_WORDS, ids=lambda n: f"words={n}")
+def test_restore_mentions_cold_matcher(benchmark, event_loop_runner, guild, words):
+    """Includes rebuilding the per-guild matcher after a roster change."""
+    interaction = FakeInteraction(guild.members[0], guild)
+    response = make_text(words, [member.name for member in guild.members[:50]])
+
+    def invalidate():
+        roster = event_loop_runner(roster_cache.get(guild))
+        roster.bump()
+
+    benchmark.pedantic(
+        lambda: event_loop_runner(restore_mentions(interaction, response)),
+        setup=invalidate,
+        rounds=5 if len(guild.members) >= 10_000 else 50,
+    )
+
+
+@pytest.mark.parametrize("players", [1, 10, 100], ids=lambda n: f"players={n}")
+def test_parse_player_ids(benchmark, players):
+    text = " ".join(f"<@!{10**17 + idx}>" if idx % 2 else f"<@{10**17 + idx}>" for idx in range(players))
+
+    result = benchmark(parse_player_ids, text)
+    assert len(result) == players
+
+
+@pytest.mark.parametrize("name", ["alice", "Ünïcødé Nàme with spaces!", "x" * 32])
+def test_format_username(benchmark, name):
+    user = FakeUser(1, name)
+
+    result = benchmark(format_username, user)
+    assert result
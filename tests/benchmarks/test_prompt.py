@@ -0,0 +1,45 @@
+"""Benchmarks for building the agent prompt."""
+import pytest
+
+from ai import interface
+from ai.history import HistoryStore
+from tests.benchmarks.fakes import FakeInteraction, make_guild, make_text
+from utils.roster import roster_cache
+
+HISTORY_TURNS = [0, 10, 100]
+MEMBERS = [100, 10_000]
+
+
+@pytest.fixture(scope="module", params=MEMBERS, ids=lambda n: f"members={n}")
+def guild(request, event_loop_runner):
+    guild = make_guild(request.param, guild_id=10**6 + request.param)
+    roster_cache.forget(guild.id)
+    event_loop_runner(roster_cache.get(guild))
+    return guild
+
+
+@pytest.fixture(params=HISTORY_TURNS, ids=lambda n: f"history={n}")
+def history_store(request, tmp_path, monkeypatch, event_loop_runner, guild):
+    # A budget large enough that no turns are folded, so no summary model is called
+    store = HistoryStore(str(tmp_path), budget_tokens=10**9)
+    monkeypatch.setattr(interface, "interaction_history", store)
+    names = [member.name for member in guild.members[:20]]
+
+    async def fill():
+        history = await store.get(guild.id, 1)
+        for idx in range(request.param):
+            history.add(make_text(30, names, seed=idx), make_text(120, names, seed=-idx), record=False)
+
+    event_loop_runner(fill())
+    return store
+
+
+def test_prepare_user_query(benchmark, event_loop_runner, guild, history_store):
+    interaction = FakeInteraction(guild.members[0], guild)
+    question = f"What did {guild.members[1].mention} and {guild.members[2].mention} say about the last game?"
+
+    enhanced, base = benchmark(
+        lambda: event_loop_runner(interface.prepare_user_query(interaction, question, command="files"))
+    )
+    assert guild.members[1].name in base
+    assert "Preloaded memory" in enhanced
@@ -0,0 +1,7 @@
+"""Shared setup for the test suite."""
+import os
+import tempfile
+
+# Stores opened at import time must not touch the real data volume
+os.environ.setdefault("DB_DIR", tempfile.mkdtemp(prefix="test-db-"))
+os.environ.setdefault("MEMORY_SNAPSHOT_FILE", "")
@@ -0,0 +1,71 @@
+"""Tests for persisted, summarized interaction history."""
+import asyncio
+
+from ai import history
+from ai.history import HistoryStore
+
+
+async def _fake_summary(summary, turns, max_tokens, model):
+    return " | ".join([summary, *(q for q, _ in turns)]).strip(" |")
+
+
+def test_replay_after_compaction_restores_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, "summarize_turns", _fake_summary)
+    compactions = []
+    rewrite = HistoryStore._rewrite
+    monkeypatch.setattr(HistoryStore, "_rewrite", staticmethod(
+        lambda path, records: (compactions.append(len(records)), rewrite(path, records))
+    ))
+
+    async def add_long(shard, start, count):
+        for idx in range(start, start + count):
+            shard.add(f"question {idx} " * 3, f"answer {idx} " * 3)
+            if shard._fold_task:
+                await shard._fold_task
+
+    async def flush(store):
+        await asyncio.get_running_loop().run_in_executor(store._writer, lambda: None)
+
+    async def fill():
+        store = HistoryStore(str(tmp_path), compact_after=6, budget_tokens=30)
+        shard = await store.get(1, 1)
+        await add_long(shard, 0, 3)
+        # Short turns fit without evicting, so one of them triggers compaction
+        for idx in range(6):
+            shard.add(f"q{idx}", f"a{idx}")
+        await flush(store)
+        assert compactions and shard.folded == 0
+        # Turns folded after compaction count from the start of the new log
+        await add_long(shard, 3, 3)
+        await flush(store)
+        return shard
+
+    async def reload():
+        return await HistoryStore(str(tmp_path), budget_tokens=30).get(1, 1)
+
+    shard = asyncio.run(fill())
+    replayed = asyncio.run(reload())
+
+    assert shard.folded > 0
+    assert replayed.summary == shard.summary
+    assert list(replayed.turns) == list(shard.turns)
+    assert replayed.render() == shard.render()
+
+
+def test_snapshot_does_not_change_state(monkeypatch):
+    monkeypatch.setattr(history, "summarize_turns", _fake_summary)
+
+    async def main():
+        manager = history.HistoryManager(budget_tokens=10)
+        manager.add("first question " * 3, "first answer " * 3)
+        manager.add("second question " * 3, "second answer " * 3)
+        await manager._fold_task
+        return manager
+
+    manager = asyncio.run(main())
+    folded = manager.folded
+    snapshot = manager.snapshot()
+
+    assert folded > 0
+    assert manager.folded == folded
+    assert snapshot[0] == {"type": "summary", "summary": manager.summary, "folded": 0}
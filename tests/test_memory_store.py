@@ -0,0 +1,58 @@
+"""Tests for knowledge graph compaction and bounded views."""
+import asyncio
+
+from ai.memory_store import KnowledgeGraphStore
+
+
+def _entity(name, entity_type="user", *observations):
+    return {"name": name, "entityType": entity_type, "observations": list(observations)}
+
+
+def _compact(tmp_path, entities, relations=()):
+    store = KnowledgeGraphStore(str(tmp_path / "memory.db"))
+
+    async def main():
+        await store.create_entities(entities)
+        await store.create_relations(list(relations))
+        removed = await store.compact()
+        return removed, await store.read_graph()
+
+    return asyncio.run(main())
+
+
+def test_compact_keeps_distinct_usernames_apart(tmp_path):
+    removed, graph = _compact(tmp_path, [
+        _entity("tom.b", "user", "likes bingo"),
+        _entity("tom_b", "user", "likes chess"),
+        _entity("tomb", "user", "likes tea"),
+        _entity("@TomB", "user", "plays on fridays", "likes tea."),
+    ])
+
+    entities = {e["name"]: e["observations"] for e in graph["entities"]}
+    assert removed["entities"] == 1
+    assert set(entities) == {"tom.b", "tom_b", "tomb"}
+    # The username the pre-fetch opens survives, with the variant's knowledge
+    assert entities["tomb"] == ["likes tea", "plays on fridays"]
+
+
+def test_compact_merges_variants_of_the_same_type_only(tmp_path):
+    removed, graph = _compact(
+        tmp_path,
+        [
+            _entity("Board Game", "game", "a"),
+            _entity("board-game", "game", "b"),
+            _entity("Board_Game", "channel", "c"),
+            _entity("sysprompt", "instructions", "be brief"),
+            _entity("SysPrompt", "instructions", "x", "y"),
+        ],
+        [
+            {"from": "board-game", "to": "sysprompt", "relationType": "uses"},
+            {"from": "sysprompt", "to": "nobody", "relationType": "knows"},
+        ],
+    )
+
+    names = sorted(e["name"] for e in graph["entities"])
+    assert removed == {"entities": 2, "observations": 0, "relations": 1}
+    assert len(names) == 3 and "sysprompt" in names and "Board_Game" in names
+    survivor = next(n for n in names if n.casefold().startswith("board") and n != "Board_Game")
+    assert graph["relations"] == [{"from": survivor, "to": "sysprompt", "relationType": "uses"}]
@@ -0,0 +1,83 @@
+"""Tests for agent scheduling and single-flight coalescing."""
+import asyncio
+
+from ai.interface import _single_flight_key
+from ai.scheduler import AgentScheduler
+from ai.streaming import StreamFanout
+from tests.benchmarks.fakes import FakeInteraction, FakeUser, make_guild
+
+
+def test_single_flight_key_is_per_user_and_channel():
+    guild = make_guild(10, guild_id=1)
+    alice, bob = guild.members[:2]
+    key = _single_flight_key(FakeInteraction(alice, guild, channel_id=1), "Who  won the game?")
+
+    assert key == _single_flight_key(FakeInteraction(alice, guild, channel_id=1), "who won the GAME?")
+    assert key != _single_flight_key(FakeInteraction(bob, guild, channel_id=1), "Who won the game?")
+    assert key != _single_flight_key(FakeInteraction(alice, guild, channel_id=2), "Who won the game?")
+
+
+def test_single_flight_coalesces_only_equal_keys():
+    scheduler = AgentScheduler()
+    runs = []
+
+    async def answer(name):
+        runs.append(name)
+        await asyncio.sleep(0.01)
+        return name
+
+    async def main():
+        return await asyncio.gather(
+            scheduler.single_flight("a", lambda: answer("first")),
+            scheduler.single_flight("a", lambda: answer("second")),
+            scheduler.single_flight("b", lambda: answer("third")),
+        )
+
+    assert asyncio.run(main()) == ["first", "first", "third"]
+    assert runs == ["first", "third"]
+    assert scheduler.stats()["coalesced"] == 1
+
+
+def test_slots_are_capped_per_user_and_handed_out_round_robin():
+    scheduler = AgentScheduler(max_concurrent=2, max_per_user=1)
+    order = []
+
+    async def run(user_id, name):
+        async with scheduler.slot(user_id, guild_id=1):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        # User 1 may only run one at a time, so a2 and a3 wait even with a slot free
+        first = asyncio.create_task(run(1, "a1"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(run(1, "a2"))
+        third = asyncio.create_task(run(1, "a3"))
+        await asyncio.sleep(0)
+        assert scheduler.stats()["running"] == 1
+        assert scheduler.stats()["queued"] == 2
+        await asyncio.gather(first, second, third, run(2, "b1"))
+
+    asyncio.run(main())
+    assert order == ["a1", "b1", "a2", "a3"]
+    assert scheduler.stats()["running"] == 0
+
+
+def test_stream_fanout_replays_text_to_late_replies():
+    class Reply:
+        def __init__(self):
+            self.text = ""
+
+        def feed(self, delta):
+            self.text += delta
+
+        def reset(self):
+            self.text = ""
+
+    fanout, early, late = StreamFanout(), Reply(), Reply()
+    fanout.add(early)
+    fanout.feed("Hello ")
+    fanout.add(late)
+    fanout.feed("there")
+
+    assert early.text == late.text == "Hello there"
@@ -0,0 +1,38 @@
+"""Per-request deadlines carried in a context variable.
+
+A deadline set for a request is inherited by every task it starts, so each
+stage can ask how much of the request's budget is left and bound its own
+waits with it.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Absolute time.monotonic() by which the current request must be answered
+_deadline_var: contextvars.ContextVar[float | None] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float | None):
+    """Give the block at most ``seconds``, never extending an enclosing deadline."""
+    at = None if seconds is None else time.monotonic() + seconds
+    current = _deadline_var.get()
+    if current is not None and (at is None or current < at):
+        at = current
+    token = _deadline_var.set(at)
+    try:
+        yield
+    finally:
+        _deadline_var.reset(token)
+
+
+def remaining(cap: float | None = None) -> float | None:
+    """Return the seconds left before the deadline, at most ``cap``.
+
+    Returns ``cap`` when there is no deadline and never goes below zero.
+    """
+    at = _deadline_var.get()
+    left = None if at is None else max(at - time.monotonic(), 0.0)
+    if cap is not None and (left is None or cap < left):
+        return cap
+    return left
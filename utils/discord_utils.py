@@ -1,91 +1,202 @@
 """Discord-related utility functions used across the bot."""
+import asyncio
 import discord
 import logging
 import re
+import time
+
+from utils.cache import TTLCache
+from utils.roster import roster_cache
+from utils.tracing import metrics
 
 logger = logging.getLogger(__name__)
 
-async def resolve_mentions(interaction: discord.Interaction, text: str) -> str:
-    """Convert Discord mentions in the provided text to usernames."""
-    mention_pattern = r'<@!?(\d+)>'
-    mentions = re.finditer(mention_pattern, text)
-    replacements = {}
-
-    for match in mentions:
-        user_id = match.group(1)
-        guild = interaction.guild
-        if guild:
-            try:
-                mentioned_member = guild.get_member(int(user_id))
-                if not mentioned_member:
-                    try:
-                        mentioned_member = await guild.fetch_member(int(user_id))
-                    except (discord.NotFound, discord.HTTPException) as e:
-                        logger.warning(f"Could not fetch member {user_id}: {e}")
-                        continue
-                if mentioned_member:
-                    logger.debug(
-                        f"Resolving mention {match.group(0)} to {mentioned_member.name}"
-                    )
-                    replacements[match.group(0)] = mentioned_member.name
-            except (ValueError, Exception) as e:
-                logger.warning(f"Error resolving mention {user_id}: {e}")
-
-    for mention, username in replacements.items():
-        text = text.replace(mention, username)
+MENTION_PATTERN = re.compile(r'<@!?(\d+)>')
 
-    return text
+# Maximum concurrent member lookups when resolving mentions
+MAX_MEMBER_FETCHES = 5
 
-async def restore_mentions(interaction: discord.Interaction, response: str) -> str:
-    """Convert usernames in the response back to Discord mentions."""
+# (guild ID, user ID) -> username, or None for users that could not be found
+mention_name_cache = TTLCache(maxsize=4096, ttl=900.0)
+_fetch_semaphore = asyncio.Semaphore(MAX_MEMBER_FETCHES)
+_fetch_stats = {"fetches": 0, "fetch_seconds": 0.0}
+_MISSING = object()
+
+
+async def _fetch_member_name(guild: discord.Guild, user_id: int) -> str | None:
+    """Fetch a single member over REST and cache the outcome."""
+    async with _fetch_semaphore:
+        try:
+            member = await guild.fetch_member(user_id)
+        except (discord.NotFound, discord.HTTPException) as e:
+            logger.warning(f"Could not fetch member {user_id}: {e}")
+            # Only remember definitive misses; transient errors are retried
+            if isinstance(e, discord.NotFound):
+                mention_name_cache.set((guild.id, user_id), None)
+            return None
+    roster_cache.upsert(member)
+    mention_name_cache.set((guild.id, user_id), member.name)
+    return member.name
+
+
+async def resolve_mention_names(guild: discord.Guild, user_ids) -> dict[int, str]:
+    """Map user IDs to usernames using the roster, the name cache, then REST.
+
+    IDs are deduplicated and any remaining lookups are issued concurrently.
+    """
+    roster = await roster_cache.get(guild)
+    names = {}
+    missing = []
+    for user_id in dict.fromkeys(user_ids):
+        entry = roster.members.get(user_id)
+        if entry:
+            names[user_id] = entry.name
+            continue
+        cached = mention_name_cache.get((guild.id, user_id), default=_MISSING)
+        if cached is _MISSING:
+            missing.append(user_id)
+        elif cached is not None:
+            names[user_id] = cached
+
+    if missing:
+        start = time.perf_counter()
+        fetched = await asyncio.gather(*(_fetch_member_name(guild, uid) for uid in missing))
+        elapsed = time.perf_counter() - start
+        _fetch_stats["fetches"] += len(missing)
+        _fetch_stats["fetch_seconds"] += elapsed
+        names.update((uid, name) for uid, name in zip(missing, fetched) if name)
+        logger.info(
+            f"Fetched {len(missing)} member(s) in {elapsed:.3f}s; "
+            f"name cache {mention_name_cache.stats()}"
+        )
+    return names
+
+
+def mention_resolution_stats() -> dict:
+    """Return name cache counters and the time spent on member lookups."""
+    return {**mention_name_cache.stats(), **_fetch_stats}
+
+
+metrics.register("mention_resolution", mention_resolution_stats)
+
+
+async def resolve_mentions_with_names(
+    interaction: discord.Interaction, text: str
+) -> tuple[str, list[str]]:
+    """Convert Discord mentions in the text to usernames.
+
+    Returns the converted text and the distinct usernames that were mentioned.
+    """
     guild = interaction.guild
     if not guild:
-        return response
+        return text, []
 
-    try:
-        members = guild.members
-        if len(members) < 10:
-            members = [member async for member in guild.fetch_members(limit=None)]
-    except Exception as e:
-        logger.warning(f"Could not fetch guild members: {e}")
-        return response
+    user_ids = [int(user_id) for user_id in MENTION_PATTERN.findall(text)]
+    if not user_ids:
+        return text, []
+    names = await resolve_mention_names(guild, user_ids)
 
-    username_to_member = {member.name.lower(): member for member in members}
-    for member in members:
-        if member.display_name != member.name:
-            username_to_member[member.display_name.lower()] = member
+    def replace_mention(match):
+        name = names.get(int(match.group(1)))
+        if name is None:
+            return match.group(0)
+        logger.debug("Resolving mention %s to %s", match.group(0), name)
+        return name
 
-    modified_response = response
+    return MENTION_PATTERN.sub(replace_mention, text), list(names.values())
 
-    at_pattern = r'@([a-zA-Z0-9_]+)'
 
-    def replace_at_mention(match):
-        username = match.group(1).lower()
-        if username in username_to_member:
-            member = username_to_member[username]
-            logger.debug(f"Converting @{username} to mention")
-            return member.mention
-        return match.group(0)
+async def resolve_mentions(interaction: discord.Interaction, text: str) -> str:
+    """Convert Discord mentions in the provided text to usernames."""
+    text, _ = await resolve_mentions_with_names(interaction, text)
+    return text
+
 
-    modified_response = re.sub(at_pattern, replace_at_mention, modified_response)
+def _trie_pattern(node: dict) -> str:
+    """Render a character trie as a regex that prefers the longest match."""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    terminal = "" in node
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+    group = f"(?:{'|'.join(branches)})"
+    return f"{group}?" if terminal else group
+
+
+class MentionMatcher:
+    """Compiled single-pass matcher that turns usernames into Discord mentions.
+
+    All names of a guild are merged into one trie-shaped alternation so a
+    response is scanned once, with longest-match-first semantics, regardless
+    of how many members the guild has. An optional leading ``@`` is consumed.
+    """
+
+    def __init__(self, names: dict[str, int]):
+        """Compile a matcher from a mapping of lowercase name to user ID."""
+        self.mentions = {name: f"<@{user_id}>" for name, user_id in names.items() if name}
+        trie: dict = {}
+        for name in self.mentions:
+            node = trie
+            for char in name:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        self.pattern = (
+            re.compile(rf"@?(?<!\w)({_trie_pattern(trie)})(?!\w)", re.IGNORECASE)
+            if trie else None
+        )
 
-    sorted_usernames = sorted(username_to_member.keys(), key=len, reverse=True)
+    def _replace(self, match: re.Match) -> str:
+        mention = self.mentions.get(match.group(1).lower())
+        if mention is None:
+            return match.group(0)
+        logger.debug("Converting '%s' to mention", match.group(0))
+        return mention
 
-    for username in sorted_usernames:
-        member = username_to_member[username]
-        pattern = r'\b' + re.escape(username) + r'\b'
+    def sub(self, text: str) -> str:
+        """Replace every known username in ``text`` with its mention."""
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(self._replace, text)
 
-        def replace_username(match):
-            logger.debug(
-                f"Converting standalone username '{match.group(0)}' to mention"
-            )
-            return member.mention
 
-        modified_response = re.sub(
-            pattern, replace_username, modified_response, flags=re.IGNORECASE
-        )
+# Guild ID -> (roster version, compiled matcher)
+_matcher_cache: dict[int, tuple[int, MentionMatcher]] = {}
+
+
+def get_mention_matcher(guild_id: int, roster_version: int, members) -> MentionMatcher:
+    """Return the cached matcher for a guild, rebuilding it if the roster changed.
+
+    ``members`` may be any objects exposing ``id``, ``name`` and ``display_name``.
+    """
+    cached = _matcher_cache.get(guild_id)
+    if cached and cached[0] == roster_version:
+        return cached[1]
+
+    names = {member.name.lower(): member.id for member in members}
+    for member in members:
+        if member.display_name != member.name:
+            names[member.display_name.lower()] = member.id
+    matcher = MentionMatcher(names)
+    _matcher_cache[guild_id] = (roster_version, matcher)
+    logger.info(f"Built mention matcher for guild {guild_id} with {len(matcher.mentions)} names")
+    return matcher
+
 
-    return modified_response
+async def restore_mentions(interaction: discord.Interaction, response: str) -> str:
+    """Convert usernames in the response back to Discord mentions."""
+    guild = interaction.guild
+    if not guild:
+        return response
+
+    try:
+        roster = await roster_cache.get(guild)
+    except Exception as e:
+        logger.warning(f"Could not load guild roster: {e}")
+        return response
+
+    matcher = get_mention_matcher(guild.id, roster.version, roster.members.values())
+    return matcher.sub(response)
 
 
 def parse_player_ids(players_str: str) -> list[int]:
@@ -111,3 +222,22 @@ def format_username(user: discord.abc.User) -> str:
     """Return a filesystem-safe version of the user's actual username."""
     base_name = getattr(user, "name", str(user))
     return re.sub(r"[^a-zA-Z0-9_.-]", "_", base_name)
+
+
+def split_message(text: str, limit: int = 2000) -> list[str]:
+    """Split text into chunks that fit in a Discord message.
+
+    Chunks break at the last newline (or failing that, space) in the second
+    half of the window when possible.
+    """
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", limit // 2, limit)
+        if cut <= 0:
+            cut = text.rfind(" ", limit // 2, limit)
+        if cut <= 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n ")
+    chunks.append(text)
+    return chunks
@@ -21,4 +21,30 @@ def get_allowed_channel_id() -> int | None:
             return int(channel)
         except ValueError:
             return None
-    return None 
\ No newline at end of file
+    return None
+
+
+def get_db_dir() -> str:
+    """Return the directory for local SQLite databases.
+
+    Defaults to the container's local ``/db`` volume, avoiding SQLite locking
+    issues on the NAS-backed ``/data`` mount.
+    """
+    load_dotenv()
+    default = "/db" if os.path.isdir("/db") else "."
+    return os.getenv("DB_DIR", default)
+
+
+def get_int_env(name: str, default: int) -> int:
+    """Return an integer environment variable, or ``default`` if unset or invalid."""
+    load_dotenv()
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def get_stream_responses() -> bool:
+    """Return whether /ask answers should be streamed into Discord."""
+    load_dotenv()
+    return os.getenv("STREAM_RESPONSES", "1").lower() not in ("0", "false", "no")
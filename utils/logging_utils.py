@@ -0,0 +1,213 @@
+"""Non-blocking structured logging.
+
+Records are handed off through a ``QueueHandler`` so code on the event loop
+never waits on disk. A ``QueueListener`` thread writes them as JSON lines to
+a size-rotated file on local disk, and a shipper thread periodically copies
+the log files to the data volume.
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+
+from utils.env_utils import get_int_env
+
+# Request ID of the interaction being handled, attached to every record
+request_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar("request_id", default=None)
+
+
+def set_request_id(request_id: str | None) -> contextvars.Token:
+    """Tag log records emitted from the current context with a request ID."""
+    return request_id_var.set(request_id)
+
+
+class RequestIdFilter(logging.Filter):
+    """Copy the current request ID onto the record before it leaves the thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Let through at most ``rate`` DEBUG records per second from each call site.
+
+    Records at INFO and above always pass. Dropped records are counted and
+    reported on the next record let through from the same call site.
+    """
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = rate
+        self._windows: dict[tuple[str, int], list[float | int]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.setdefault(key, [now, 0, 0])
+            if now - window[0] >= 1:
+                window[0], window[1] = now, 0
+            if window[1] >= self.rate:
+                window[2] += 1
+                return False
+            window[1] += 1
+            record.sampled_out, window[2] = window[2], 0
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        if getattr(record, "sampled_out", 0):
+            entry["sampled_out"] = record.sampled_out
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+    def formatTime(self, record: logging.LogRecord, datefmt: str | None = None) -> str:
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z"
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that keeps the traceback separate from the message."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class LogShipper:
+    """Periodically copy changed log files from local disk to a remote directory."""
+
+    def __init__(self, source_dir: str, target_dir: str, interval: float):
+        self.source_dir = source_dir
+        self.target_dir = target_dir
+        self.interval = interval
+        self._shipped: dict[str, tuple[int, float]] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=10)
+        self.ship()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.ship()
+
+    def ship(self):
+        """Copy every log file whose size or mtime changed since the last run."""
+        try:
+            os.makedirs(self.target_dir, exist_ok=True)
+            for entry in os.scandir(self.source_dir):
+                stat = entry.stat()
+                signature = (stat.st_size, stat.st_mtime)
+                if not entry.is_file() or self._shipped.get(entry.name) == signature:
+                    continue
+                target = os.path.join(self.target_dir, entry.name)
+                shutil.copyfile(entry.path, f"{target}.tmp")
+                os.replace(f"{target}.tmp", target)
+                self._shipped[entry.name] = signature
+        except OSError as e:
+            # Logging from here could recurse into a broken handler
+            sys.stderr.write(f"Log shipping to {self.target_dir} failed: {e}\n")
+            sys.stderr.flush()
+
+
+def _parse_levels(spec: str) -> dict[str, str]:
+    """Parse ``"module=LEVEL,other.module=LEVEL"`` into a mapping."""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(filename: str = "bot.log", ship: bool = True) -> logging.handlers.QueueListener:
+    """Configure the root logger for the process and start the writer thread.
+
+    Child processes writing to the same ``LOG_DIR`` pass ``ship=False``; the
+    bot process ships the whole directory.
+
+    Environment:
+        LOG_LEVEL: root level (default DEBUG)
+        LOG_LEVELS: per-module levels, e.g. ``discord=INFO,utils.discord_utils=WARNING``
+        LOG_DEBUG_RATE: DEBUG records per second allowed per call site, 0 for no limit (default 5)
+        LOG_DIR: local directory for the log files (default ``logs``)
+        LOG_MAX_BYTES / LOG_BACKUPS: rotation size and number of rotated files (default 10 MiB, 5)
+        LOG_SHIP_DIR: directory the logs are copied to (default ``/data/logs`` when ``/data`` exists)
+        LOG_SHIP_INTERVAL: seconds between copies (default 300)
+    """
+    log_dir = os.getenv("LOG_DIR", "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, filename),
+        maxBytes=get_int_env("LOG_MAX_BYTES", 10 * 1024 * 1024),
+        backupCount=get_int_env("LOG_BACKUPS", 5),
+        encoding="utf-8",
+    )
+    file_handler.setFormatter(JSONFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(get_int_env("LOG_DEBUG_RATE", 5)))
+    queue_handler.addFilter(RequestIdFilter())
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "DEBUG").upper())
+    root.addHandler(queue_handler)
+    for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+    listener.start()
+
+    ship_dir = os.getenv("LOG_SHIP_DIR", "/data/logs" if os.path.exists("/data") else "")
+    shipper = None
+    if ship and ship_dir and os.path.abspath(ship_dir) != os.path.abspath(log_dir):
+        shipper = LogShipper(log_dir, ship_dir, get_int_env("LOG_SHIP_INTERVAL", 300))
+        shipper.start()
+
+    def shutdown():
+        listener.stop()
+        if shipper:
+            shipper.stop()
+
+    atexit.register(shutdown)
+    logging.getLogger(__name__).info(
+        f"Logging to {file_handler.baseFilename}" + (f", shipped to {ship_dir}" if shipper else "")
+    )
+    return listener
@@ -0,0 +1,93 @@
+"""Event-driven cache of guild member rosters used for mention handling."""
+import asyncio
+import itertools
+import logging
+from typing import NamedTuple
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Globally unique roster versions so a reloaded guild never reuses an old key
+_versions = itertools.count(1)
+
+
+class RosterEntry(NamedTuple):
+    """Compact snapshot of the member fields needed for mentions."""
+
+    id: int
+    name: str
+    display_name: str
+
+    @classmethod
+    def from_member(cls, member: discord.Member) -> "RosterEntry":
+        return cls(member.id, member.name, member.display_name)
+
+
+class GuildRoster:
+    """Members of a single guild keyed by user ID, with a change version."""
+
+    def __init__(self, entries: list[RosterEntry]):
+        self.members = {entry.id: entry for entry in entries}
+        self.version = next(_versions)
+
+    def bump(self):
+        self.version = next(_versions)
+
+
+class RosterCache:
+    """Per-guild member snapshots kept current through gateway member events.
+
+    A guild is loaded lazily the first time it is needed, from the gateway
+    member cache (chunking the guild once if required). After that it is only
+    updated by events, so the request path never makes member REST calls.
+    """
+
+    def __init__(self):
+        self._guilds: dict[int, GuildRoster] = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, guild: discord.Guild) -> GuildRoster:
+        """Return the roster for a guild, loading it on first use."""
+        roster = self._guilds.get(guild.id)
+        if roster is None:
+            async with self._lock:
+                roster = self._guilds.get(guild.id)
+                if roster is None:
+                    roster = await self._load(guild)
+        return roster
+
+    async def _load(self, guild: discord.Guild) -> GuildRoster:
+        if not guild.chunked:
+            try:
+                await guild.chunk()
+            except Exception as e:
+                logger.warning(f"Could not chunk guild {guild.id}: {e}")
+        roster = GuildRoster([RosterEntry.from_member(m) for m in guild.members])
+        self._guilds[guild.id] = roster
+        logger.info(f"Loaded roster for guild {guild.id} with {len(roster.members)} members")
+        return roster
+
+    def upsert(self, member: discord.Member):
+        """Add or refresh a member in an already loaded roster."""
+        roster = self._guilds.get(member.guild.id)
+        if roster is None:
+            return
+        entry = RosterEntry.from_member(member)
+        if roster.members.get(member.id) != entry:
+            roster.members[member.id] = entry
+            roster.bump()
+
+    def remove(self, member: discord.Member):
+        """Drop a member from an already loaded roster."""
+        roster = self._guilds.get(member.guild.id)
+        if roster is not None and roster.members.pop(member.id, None) is not None:
+            roster.bump()
+
+    def forget(self, guild_id: int):
+        """Discard a guild's roster so it is reloaded on next use."""
+        self._guilds.pop(guild_id, None)
+
+
+# Roster cache shared by the whole bot
+roster_cache = RosterCache()
@@ -0,0 +1,45 @@
+"""Base class for small SQLite stores used from async code."""
+import asyncio
+import os
+import sqlite3
+import threading
+
+
+class SQLiteStore:
+    """A lazily opened SQLite database accessed through one locked connection.
+
+    Subclasses define ``SCHEMA`` and implement their queries as synchronous
+    methods on ``self._conn``; ``_call`` runs such a method as one transaction
+    in a worker thread so the event loop never blocks on disk I/O.
+    """
+
+    SCHEMA = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+            with conn:
+                self._on_open()
+        return self._conn
+
+    def _on_open(self):
+        """Hook run once, in a transaction, after the database is first opened."""
+
+    def _run(self, fn, *args):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return fn(*args)
+
+    async def _call(self, fn, *args):
+        return await asyncio.to_thread(self._run, fn, *args)
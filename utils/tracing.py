@@ -0,0 +1,258 @@
+"""Lightweight request tracing and in-memory metrics.
+
+Spans time the stages of a request into histograms and, while a request
+trace is active, into a per-request breakdown that is logged when it ends.
+Counters and histograms can be rendered as Prometheus text for scraping or
+summarized for the ``/stats`` command.
+"""
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "bingobot"
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# (span name, seconds) pairs recorded for the request being handled
+_trace_var: contextvars.ContextVar[list[tuple[str, float]] | None] = contextvars.ContextVar("trace", default=None)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Fixed-bucket histogram with quantile estimates."""
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, counts: list[int], total: float):
+        """Add the bucket counts and sum of another histogram with the same buckets."""
+        for idx, count in enumerate(counts):
+            self.counts[idx] += count
+        self.count += sum(counts)
+        self.sum += total
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for idx, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[idx - 1] if idx else 0.0
+                upper = self.buckets[idx] if idx < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+def _labels(labels: dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters and histograms plus collected gauges.
+
+    Components that already keep their own counters register a collector
+    returning a ``stats()`` dict; nested dicts become a ``kind`` label.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, Labels], float] = {}
+        self._histograms: dict[tuple[str, Labels], Histogram] = {}
+        self._collectors: dict[str, Callable[[], dict]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def drain(self) -> dict:
+        """Return and reset the counters and histograms as JSON-friendly lists.
+
+        Used by worker processes to ship their metrics to the bot process,
+        which adds them to its own registry with ``merge``.
+        """
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            histograms, self._histograms = self._histograms, {}
+        return {
+            "counters": [[name, labels, value] for (name, labels), value in counters.items()],
+            "histograms": [[name, labels, h.counts, h.sum] for (name, labels), h in histograms.items()],
+        }
+
+    def merge(self, data: dict):
+        """Add metrics produced by ``drain`` in another process."""
+        with self._lock:
+            for name, labels, value in data["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                self._counters[key] = self._counters.get(key, 0) + value
+            for name, labels, counts, total in data["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram()
+                histogram.merge(counts, total)
+
+    def register(self, name: str, collector: Callable[[], dict]):
+        """Export the numeric values of ``collector()`` as ``<name>_<key>`` gauges."""
+        self._collectors[name] = collector
+
+    def counters(self, name: str) -> dict[Labels, float]:
+        with self._lock:
+            return {labels: value for (n, labels), value in self._counters.items() if n == name}
+
+    def histograms(self, name: str) -> dict[Labels, Histogram]:
+        with self._lock:
+            return {labels: h for (n, labels), h in self._histograms.items() if n == name}
+
+    def gauges(self) -> dict[tuple[str, Labels], float]:
+        gauges = {}
+        for prefix, collector in self._collectors.items():
+            try:
+                stats = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector {prefix} failed: {e}")
+                continue
+            for key, value in stats.items():
+                if isinstance(value, dict):
+                    for sub_key, sub_value in value.items():
+                        if isinstance(sub_value, (int, float)):
+                            gauges[(f"{prefix}_{sub_key}", (("kind", str(key)),))] = sub_value
+                elif isinstance(value, (int, float)):
+                    gauges[(f"{prefix}_{key}", ())] = value
+        return gauges
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (h.buckets, list(h.counts), h.count, h.sum) for key, h in self._histograms.items()}
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{METRIC_PREFIX}_{name}{_format_labels(labels)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} histogram")
+            for (n, labels), (buckets, counts, count, total) in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    le = f'le="{bound}"'
+                    lines.append(f"{METRIC_PREFIX}_{name}_bucket{_format_labels(labels, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{METRIC_PREFIX}_{name}_bucket{_format_labels(labels, le)} {count}")
+                lines.append(f"{METRIC_PREFIX}_{name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{METRIC_PREFIX}_{name}_count{_format_labels(labels)} {count}")
+        gauges = self.gauges()
+        for name in sorted({name for name, _ in gauges}):
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+            for (n, labels), value in sorted(gauges.items()):
+                if n == name:
+                    lines.append(f"{METRIC_PREFIX}_{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Atomically write the Prometheus text file, e.g. for node_exporter's textfile collector."""
+        text = self.render_prometheus()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+# Registry shared by the whole process
+metrics = MetricsRegistry()
+
+
+def record_span(name: str, seconds: float, metric: str = "span_seconds", **labels):
+    """Record a stage duration that was measured elsewhere.
+
+    The duration goes into the ``metric`` histogram, labelled with the span
+    name unless other labels are given, and into the current request trace.
+    """
+    metrics.observe(metric, seconds, **(labels or {"span": name}))
+    trace = _trace_var.get()
+    if trace is not None:
+        trace.append((name, seconds))
+
+
+@contextmanager
+def span(name: str):
+    """Time a stage of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+
+@contextmanager
+def capture_spans():
+    """Collect the spans recorded inside the block without logging them."""
+    spans: list[tuple[str, float]] = []
+    token = _trace_var.set(spans)
+    try:
+        yield spans
+    finally:
+        _trace_var.reset(token)
+
+
+def extend_trace(spans: list[tuple[str, float]]):
+    """Add spans whose durations were already observed elsewhere to the current trace."""
+    trace = _trace_var.get()
+    if trace is not None:
+        trace.extend((name, seconds) for name, seconds in spans)
+
+
+@contextmanager
+def request_trace(name: str):
+    """Collect the spans of one request and log their breakdown when it ends."""
+    trace: list[tuple[str, float]] = []
+    token = _trace_var.set(trace)
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        _trace_var.reset(token)
+        total = time.perf_counter() - start
+        record_span(name, total)
+        breakdown = ", ".join(f"{span_name}={secs:.3f}s" for span_name, secs in trace)
+        logger.info(f"Trace {name}: total={total:.3f}s; {breakdown}")